@@ -1,30 +1,90 @@
+from datetime import datetime
+from typing import List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from pydantic import ValidationError
+from beanie import PydanticObjectId
+from pydantic import BaseModel
 
 from app.config import settings
-from app.models.user import User
+from app.models.user import User, UserStatus
 from app.auth.jwt import decode_access_token
+from app.services.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+class Principal(BaseModel):
+    # The part of a User that authorization decisions need
+    id: PydanticObjectId
+    role: str
+    status: str
+    permissions: List[str] = []
+
+# token -> user id, and user id -> Principal; both bounded by AUTH_CACHE_TTL_SECONDS.
+# Nothing in the API changes role, status or permissions, so a change made in the
+# database reaches each worker within that TTL. Lockout only gates login and
+# isn't part of the principal.
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def verify_token(token: str) -> PydanticObjectId:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
     payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
-    
-    user_id: str = payload.get("sub")
-    if user_id is None:
+
+    sub = payload.get("sub")
+    if sub is None:
+        raise credentials_exception
+
+    try:
+        user_id = PydanticObjectId(sub)
+    except Exception:
         raise credentials_exception
-        
-    user = await User.get(user_id)
+
+    # Never cache a token past its own expiry
+    remaining = payload.get("exp", 0) - datetime.utcnow().timestamp()
+    token_cache.set(token, user_id, min(settings.AUTH_CACHE_TTL_SECONDS, remaining))
+    return user_id
+
+async def load_principal(user_id: PydanticObjectId) -> Principal:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    doc = await User.get_motor_collection().find_one(
+        {"_id": user_id},
+        {"role": 1, "status": 1, "permissions": 1}
+    )
+    if doc is None:
+        raise credentials_exception
+
+    principal = Principal(
+        id=user_id,
+        role=doc.get("role", "user"),
+        status=doc.get("status", UserStatus.ACTIVE.value),
+        permissions=doc.get("permissions", [])
+    )
+    principal_cache.set(user_id, principal)
+    return principal
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    principal = await load_principal(verify_token(token))
+    if principal.status != UserStatus.ACTIVE:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is not active")
+    return principal
+
+async def get_current_user_document(principal: Principal = Depends(get_current_user)) -> User:
+    # Full user document, for the few routes that need more than the principal
+    user = await User.get(principal.id)
     if user is None:
         raise credentials_exception
     return user
@@ -8,6 +8,70 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30 days
     FRONTEND_URL: str = "http://localhost:3000"
     SECRET_KEY: Optional[str] = None
+    AUTH_CACHE_TTL_SECONDS: int = 30  # max staleness of a cached role/status
+    AUTH_CACHE_SIZE: int = 10000
+
+    # MongoDB connection pool (per worker process)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10  # kept warm so bursts don't wait on TLS handshakes
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000  # how long a request waits during a failover
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 30000  # above the slowest analytics aggregation
+    MONGO_COMPRESSORS: str = "zstd,snappy,zlib"  # first one both sides support; missing modules are skipped
+    # Profile, page, vCard and scan lookups; secondaries can lag a just-saved profile by replication delay
+    MONGO_PUBLIC_READ_PREFERENCE: str = "primary"
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # queued + running before logins get 503
+    MAX_LOGIN_ATTEMPTS: int = 5
+    LOGIN_LOCK_MINUTES: int = 120
+
+    # Username availability filter (~1.2 MB for a million names at 1%)
+    USERNAME_BLOOM_CAPACITY: int = 1000000
+    USERNAME_BLOOM_ERROR_RATE: float = 0.01
+
+    # Response compression
+    COMPRESSION_MIN_BYTES: int = 1024  # smaller bodies go out as-is
+
+    # Public profile reads
+    PROFILE_CACHE_SIZE: int = 50000
+    PROFILE_CACHE_TTL_SECONDS: int = 60  # staleness bound across workers
+    PROFILE_MAX_AGE_SECONDS: int = 30  # what CDNs and browsers may serve without asking
+    PROFILE_PAGE_CACHE_SIZE: int = 20000  # rendered /p/{username} pages
+    VCARD_CACHE_SIZE: int = 20000
+    VCARD_BATCH_MAX_PROFILES: int = 1000
+
+    # Uploaded media
+    MEDIA_ROOT: str = ".media"
+    MEDIA_BASE_URL: str = "/media"  # set to an absolute URL when the API is on its own host
+    AVATAR_MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024
+    AVATAR_MAX_PIXELS: int = 40000000  # checked from the header before decoding
+
+    # QR image rendering
+    QR_RENDER_CACHE_SIZE: int = 512  # images kept in memory
+    QR_RENDER_CACHE_DIR: str = ".cache/qr"
+    RENDER_WORKERS: Optional[int] = None  # defaults to the CPU count
+    LOGO_ALLOWED_HOSTS: str = ""  # comma-separated hosts remote logos may come from; empty allows none
+    LOGO_MAX_BYTES: int = 2 * 1024 * 1024
+
+    # Public scan redirects
+    SCAN_CACHE_SIZE: int = 100000
+    SCAN_CACHE_TTL_SECONDS: int = 60
+    SCAN_FLUSH_INTERVAL_SECONDS: float = 2.0  # max window of scan counts lost on a crash
+    SCAN_FLUSH_MAX_KEYS: int = 10000
+    SCAN_BUCKET_MAX_EVENTS: int = 5000  # per QR per hour; counts stay exact beyond it
+
+    # Analytics ingestion
+    ANALYTICS_BATCH_MAX_EVENTS: int = 500
+    ANALYTICS_BUFFER_MAX_EVENTS: int = 50000  # beyond this, events spill to disk
+    ANALYTICS_FLUSH_BATCH_SIZE: int = 1000
+    ANALYTICS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ANALYTICS_SPILL_DIR: str = ".cache/analytics-spill"
+    ANALYTICS_SEGMENT_MAX_BYTES: int = 16 * 1024 * 1024
+    SKETCH_FLUSH_INTERVAL_SECONDS: float = 30.0
     
     class Config:
         env_file = ".env"
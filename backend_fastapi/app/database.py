@@ -1,14 +1,57 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
+import importlib.util
+import time
+from typing import List, Optional, Type
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from beanie import Document, init_beanie
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from app.config import settings
+from app.services.pool_stats import pool_stats
+from app.services.metrics import command_metrics
 from app.models.user import User
 from app.models.profile import Profile
 from app.models.qr import QRCode
 from app.models.order import Order
-from app.models.analytics import Analytics
+from app.models.analytics import Analytics, HourlyAnalyticsRollup, DailyAnalyticsRollup, UniqueSketch
+from app.models.scan import ScanBucket
+
+client: Optional[AsyncIOMotorClient] = None
+# Multi-document transactions need a replica set or a mongos
+transactions_supported = False
+
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+def _compressors(names: str) -> List[str]:
+    # pymongo warns about and drops compressors whose module is missing; skip them quietly
+    wanted = [name.strip() for name in names.split(",") if name.strip()]
+    return [name for name in wanted if importlib.util.find_spec(COMPRESSOR_MODULES.get(name, name)) is not None]
+
+_public_read_preference = make_read_preference(read_pref_mode_from_name(settings.MONGO_PUBLIC_READ_PREFERENCE), None)
+
+def public_collection(document: Type[Document]) -> AsyncIOMotorCollection:
+    """The collection for anonymous, staleness-tolerant reads, on MONGO_PUBLIC_READ_PREFERENCE."""
+    return document.get_motor_collection().with_options(read_preference=_public_read_preference)
+
+async def _detect_transactions(client: AsyncIOMotorClient) -> bool:
+    try:
+        hello = await client.admin.command("hello")
+    except PyMongoError:
+        return False
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
 
 async def init_db():
-    client = AsyncIOMotorClient(settings.MONGO_URI)
+    global client, transactions_supported
+    client = AsyncIOMotorClient(
+        settings.MONGO_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        compressors=_compressors(settings.MONGO_COMPRESSORS),
+        event_listeners=[pool_stats, command_metrics],
+    )
     await init_beanie(
         database=client.get_default_database(), 
         document_models=[
@@ -16,6 +59,23 @@ async def init_db():
             Profile,
             QRCode,
             Order,
-            Analytics
+            Analytics,
+            HourlyAnalyticsRollup,
+            DailyAnalyticsRollup,
+            UniqueSketch,
+            ScanBucket
         ]
     )
+    transactions_supported = await _detect_transactions(client)
+
+async def ping() -> float:
+    """Round trip of a ping to the primary, in milliseconds."""
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    return (time.perf_counter() - started) * 1000
+
+def close_db():
+    global client
+    if client is not None:
+        client.close()
+        client = None
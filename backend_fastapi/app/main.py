@@ -1,8 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from pymongo.errors import PyMongoError
 from app.config import settings
-from app.database import init_db
-from app.routes import auth, profiles, qr, orders, analytics, admin
+from app.database import init_db, close_db, ping
+from app.services.pool_stats import pool_stats
+from app.services.workers import shutdown_workers
+from app.services.scan_counter import scan_counter
+from app.services.analytics_buffer import analytics_buffer
+from app.services.unique_counts import unique_counter
+from app.services.usernames import username_allocator
+from app.services.compression import CompressionMiddleware
+from app.services import metrics
+from app.routes import auth, profiles, qr, orders, analytics, admin, scan, pages, media
 
 app = FastAPI(
     title="TapOnn Backend API",
@@ -25,11 +35,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+# Outermost, so latency includes compression and every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.on_event("startup")
 async def start_db():
     await init_db()
+    username_allocator.start()
+    scan_counter.start()
+    analytics_buffer.start()
+    unique_counter.start()
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    await username_allocator.stop()
+    await scan_counter.stop()
+    await analytics_buffer.stop()
+    await unique_counter.stop()
+    shutdown_workers()
+    # Last: the flushes above still write through the client
+    close_db()
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -48,9 +77,31 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/health/ready", tags=["Health"])
+async def readiness_check():
+    try:
+        ping_ms = await ping()
+    except PyMongoError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "database": type(e).__name__, "pool": pool_stats.snapshot()}
+        )
+    return {
+        "status": "ready",
+        "database": {"pingMs": round(ping_ms, 3)},
+        "pool": pool_stats.snapshot()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiles"])
 app.include_router(qr.router, prefix="/api/qr", tags=["QR Codes"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(scan.router, tags=["Scan"])
+app.include_router(pages.router, tags=["Pages"])
+app.include_router(media.router, prefix="/media", tags=["Media"])
@@ -2,6 +2,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING
 
 class Location(BaseModel):
     country: Optional[str] = None
@@ -40,3 +41,43 @@ class Analytics(Document):
 
     class Settings:
         name = "analytics"
+
+class AnalyticsRollup(Document):
+    # Event counts per (profile, qrCode, eventType) for one time bucket
+    profile: Optional[PydanticObjectId] = None
+    qrCode: Optional[PydanticObjectId] = None
+    eventType: str
+    bucket: datetime
+    total: int = 0
+
+ROLLUP_INDEXES = [
+    IndexModel(
+        [("profile", ASCENDING), ("bucket", ASCENDING), ("eventType", ASCENDING), ("qrCode", ASCENDING)],
+        unique=True
+    ),
+]
+
+class HourlyAnalyticsRollup(AnalyticsRollup):
+    class Settings:
+        name = "analytics_rollups_hourly"
+        indexes = ROLLUP_INDEXES
+
+class DailyAnalyticsRollup(AnalyticsRollup):
+    class Settings:
+        name = "analytics_rollups_daily"
+        indexes = ROLLUP_INDEXES
+
+class UniqueSketch(Document):
+    # HyperLogLog registers; bucket is the day, or None for all-time
+    scope: str  # "profile" (visitors) or "qr" (scanners)
+    key: PydanticObjectId
+    bucket: Optional[datetime] = None
+    registers: bytes
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "unique_sketches"
+        indexes = [
+            IndexModel([("scope", ASCENDING), ("key", ASCENDING), ("bucket", ASCENDING)], unique=True),
+        ]
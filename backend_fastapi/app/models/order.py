@@ -2,6 +2,7 @@ from typing import Optional, List, Dict
 from datetime import datetime
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import IndexModel
 from enum import Enum
 
 class OrderStatus(str, Enum):
@@ -71,3 +72,5 @@ class Order(Document):
 
     class Settings:
         name = "orders"
+        # Serves the owner's listing in keyset order (see app/services/pagination.py)
+        indexes = [IndexModel([("user", 1), ("created_at", -1), ("_id", -1)])]
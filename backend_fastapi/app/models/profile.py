@@ -2,6 +2,7 @@ from typing import Optional, List, Dict
 from datetime import datetime
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import IndexModel
 
 class SocialLinks(BaseModel):
     website: Optional[str] = None
@@ -34,13 +35,14 @@ class ProfileSettings(BaseModel):
 class Profile(Document):
     user: Indexed(PydanticObjectId)
     displayName: str = Field(..., max_length=100)
-    username: Optional[Indexed(str, unique=True, sparse=True)] = None
+    username: Optional[str] = None
     bio: Optional[str] = Field(None, max_length=500)
     jobTitle: Optional[str] = Field(None, max_length=100)
     company: Optional[str] = Field(None, max_length=100)
     location: Optional[str] = Field(None, max_length=100)
     website: Optional[str] = None
     avatar: Optional[str] = None
+    avatarVariants: Dict[str, str] = {}  # size in px -> URL; avatar is the largest
     theme: str = "default"
     isPublic: bool = True
     
@@ -49,8 +51,19 @@ class Profile(Document):
     customFields: List[CustomField] = []
     settings: ProfileSettings = ProfileSettings()
     
+    version: int = 0  # bumped on every update; see app/services/versioning.py
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "profiles"
+        # Indexed() inside Optional is never picked up, and sparse would still
+        # index explicit nulls; a partial index only covers real usernames
+        indexes = [
+            IndexModel(
+                [("username", 1)],
+                name="username_unique",
+                unique=True,
+                partialFilterExpression={"username": {"$type": "string"}},
+            )
+        ]
@@ -2,6 +2,12 @@ from typing import Optional, List, Dict
 from datetime import datetime
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import IndexModel
+
+# Enforced on input by app/schemas/qr.py and clamped again when rendering
+QR_MIN_SIZE = 32
+QR_MAX_SIZE = 2048
+QR_MAX_MARGIN = 20
 
 class QRSettings(BaseModel):
     size: int = 200
@@ -23,7 +29,6 @@ class QRAnalytics(BaseModel):
     totalScans: int = 0
     uniqueScans: int = 0
     lastScannedAt: Optional[datetime] = None
-    scanHistory: List[ScanHistoryItem] = []
 
 class QRCode(Document):
     user: Indexed(PydanticObjectId)
@@ -38,8 +43,13 @@ class QRCode(Document):
     settings: QRSettings = QRSettings()
     analytics: QRAnalytics = QRAnalytics()
     
+    version: int = 0  # bumped on every update; see app/services/versioning.py
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "qrcodes"
+        # Serves the owner's listing in keyset order (see app/services/pagination.py)
+        indexes = [IndexModel([("user", 1), ("created_at", -1), ("_id", -1)])]
+        # Scan history lives in scan_buckets; never pull a legacy embedded copy
+        projection = {"analytics.scanHistory": 0}
@@ -0,0 +1,24 @@
+from typing import Optional, List
+from datetime import datetime
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+class ScanBucket(Document):
+    # One document per QR code per hour; scans are stored as parallel arrays
+    qrCode: PydanticObjectId
+    bucket: datetime
+    total: int = 0  # every scan in the hour, including those past the event cap
+    offsets: List[int] = []  # seconds since bucket start
+    ipAddress: List[Optional[str]] = []
+    userAgent: List[Optional[str]] = []
+    device: List[Optional[str]] = []
+    location: List[Optional[str]] = []
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "scan_buckets"
+        indexes = [
+            IndexModel([("qrCode", ASCENDING), ("bucket", ASCENDING)], unique=True),
+        ]
@@ -1,8 +1,9 @@
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 from beanie import Document, Indexed
 from pydantic import Field, EmailStr
 from enum import Enum
+from app.config import settings
 
 class UserRole(str, Enum):
     USER = "user"
@@ -40,22 +41,42 @@ class User(Document):
     class Settings:
         name = "users"
         
-    async def inc_login_attempts(self):
-        if self.lock_until and self.lock_until < datetime.utcnow():
-            self.loginAttempts = 1
-            self.lockUntil = None
-            self.isLocked = False
-            await self.save()
-            return
+    def is_locked(self) -> bool:
+        return bool(self.lockUntil and self.lockUntil > datetime.utcnow())
 
-        self.loginAttempts += 1
-        # if self.loginAttempts >= 5:
-        #     self.isLocked = True
-        #     self.lockUntil = datetime.utcnow() + timedelta(hours=2)
-        await self.save()
+    @classmethod
+    async def record_failed_login(cls, user_id) -> None:
+        # One atomic pipeline update, so concurrent failures can't lose increments
+        now = datetime.utcnow()
+        lock_expired = {"$and": [{"$gt": ["$lockUntil", None]}, {"$lte": ["$lockUntil", now]}]}
+        still_locked = {"$gt": ["$lockUntil", now]}
+        await cls.get_motor_collection().update_one({"_id": user_id}, [
+            {"$set": {
+                # A previous lock that has expired restarts the count at 1
+                "loginAttempts": {"$cond": [lock_expired, 1, {"$add": [{"$ifNull": ["$loginAttempts", 0]}, 1]}]},
+                "lockUntil": {"$cond": [lock_expired, None, "$lockUntil"]},
+            }},
+            {"$set": {
+                "lockUntil": {"$cond": [
+                    {"$and": [{"$gte": ["$loginAttempts", settings.MAX_LOGIN_ATTEMPTS]}, {"$not": [still_locked]}]},
+                    now + timedelta(minutes=settings.LOGIN_LOCK_MINUTES),
+                    "$lockUntil"
+                ]},
+            }},
+            {"$set": {"isLocked": still_locked, "updated_at": now}},
+        ])
 
-    async def reset_login_attempts(self):
-        self.loginAttempts = 0
-        self.lockUntil = None
-        self.isLocked = False
-        await self.save()
+    @classmethod
+    async def record_successful_login(cls, user_id, new_password_hash: Optional[str] = None) -> datetime:
+        now = datetime.utcnow()
+        update = {
+            "loginAttempts": 0,
+            "lockUntil": None,
+            "isLocked": False,
+            "lastLogin": now,
+        }
+        if new_password_hash:
+            update["password"] = new_password_hash
+            update["updated_at"] = now
+        await cls.get_motor_collection().update_one({"_id": user_id}, {"$set": update})
+        return now
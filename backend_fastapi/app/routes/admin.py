@@ -1,19 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.models.user import User, UserRole
 from app.models.profile import Profile
 from app.models.order import Order
-from app.auth.deps import get_current_user
+from app.models.qr import QRCode
+from app.schemas.qr import PrintBatchRequest
+from app.services.serialization import FastJSONResponse
+from app.auth.deps import get_current_user, Principal
+from app.services.print_batch import stream_print_batch
+from beanie.operators import In
 from typing import List
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
-def check_admin(user: User = Depends(get_current_user)):
+def check_admin(user: Principal = Depends(get_current_user)):
     if user.role != UserRole.ADMIN and user.role != UserRole.SUPER_ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
 @router.get("/dashboard")
-async def get_dashboard_stats(admin: User = Depends(check_admin)):
+async def get_dashboard_stats(admin: Principal = Depends(check_admin)):
     total_users = await User.count()
     total_profiles = await Profile.count()
     total_orders = await Order.count()
@@ -28,3 +34,27 @@ async def get_dashboard_stats(admin: User = Depends(check_admin)):
             }
         }
     }
+
+@router.post("/print-batches")
+async def create_print_batch(batch_in: PrintBatchRequest, admin: Principal = Depends(check_admin)):
+    if batch_in.format not in ("png", "svg"):
+        raise HTTPException(status_code=400, detail="Format must be png or svg")
+
+    if batch_in.qrIds:
+        query = QRCode.find(In(QRCode.id, batch_in.qrIds))
+        label = "qr-batch"
+    elif batch_in.orderId:
+        order = await Order.get(batch_in.orderId)
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        # One card per active QR code of the ordering account
+        query = QRCode.find(QRCode.user == order.user, QRCode.isActive == True)
+        label = order.orderNumber
+    else:
+        raise HTTPException(status_code=400, detail="Provide orderId or qrIds")
+
+    return StreamingResponse(
+        stream_print_batch(query.sort(+QRCode.id), batch_in.format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{label}.zip"'}
+    )
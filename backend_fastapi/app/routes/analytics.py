@@ -1,27 +1,40 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Query
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from app.config import settings
 from app.models.analytics import Analytics
 from app.models.profile import Profile
 from app.schemas.analytics import AnalyticsRecord, AnalyticsResponse
-from app.auth.deps import get_current_user
-from app.models.user import User
-from typing import Optional
+from app.services.serialization import FastJSONResponse
+from app.auth.deps import get_current_user, Principal
+from app.services.analytics_buffer import analytics_buffer
+from app.services.rollups import GRANULARITIES
+from app.services.unique_counts import unique_counter
+from app.services.timezones import naive_utc
+from beanie import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from typing import Optional, List
 
-router = APIRouter()
+MAX_SUMMARY_BUCKETS = {"hour": 24 * 31, "day": 366 * 2}
 
-@router.post("/record", status_code=status.HTTP_201_CREATED)
-async def record_event(
-    record: AnalyticsRecord,
-    request: Request,
-    current_user: Optional[User] = Depends(get_current_user) # Optional auth
-):
-    ip = request.client.host
-    
-    metadata = record.metadata or {}
-    metadata['ipAddress'] = ip
-    metadata['userAgent'] = request.headers.get('user-agent')
-    
-    analytics = Analytics(
-        user=current_user.id if current_user else None,
+router = APIRouter(default_response_class=FastJSONResponse)
+
+def request_metadata(request: Request) -> dict:
+    return {
+        'ipAddress': request.client.host if request.client else None,
+        'userAgent': request.headers.get('user-agent'),
+    }
+
+def build_event(record: AnalyticsRecord, user_id: Optional[PydanticObjectId], shared: dict) -> Analytics:
+    metadata = dict(record.metadata or {})
+    metadata.update(shared)
+
+    return Analytics(
+        id=PydanticObjectId(),
+        user=user_id,
         profile=record.profileId,
         qrCode=record.qrCodeId,
         eventType=record.eventType,
@@ -33,7 +46,39 @@ async def record_event(
         performance=record.performance or {},
         conversion=record.conversion or {}
     )
-    await analytics.save()
+
+async def parse_batch(request: Request) -> list:
+    body = await request.body()
+    content_type = request.headers.get('content-type', '')
+    try:
+        if 'ndjson' in content_type or 'jsonlines' in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON body")
+
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected an array of events")
+    if len(items) > settings.ANALYTICS_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ANALYTICS_BATCH_MAX_EVENTS} events per batch"
+        )
+    return items
+
+def to_db(event: Analytics) -> dict:
+    return get_dict(event, to_db=True, keep_nulls=True)
+
+@router.post("/record", status_code=status.HTTP_202_ACCEPTED)
+async def record_event(
+    record: AnalyticsRecord,
+    request: Request,
+    current_user: Optional[Principal] = Depends(get_current_user) # Optional auth
+):
+    analytics = build_event(record, current_user.id if current_user else None, request_metadata(request))
+    # Written behind the request by the analytics buffer
+    await analytics_buffer.submit([to_db(analytics)])
     
     # Update profile counters
     if record.profileId:
@@ -45,3 +90,86 @@ async def record_event(
              pass
 
     return {"success": True, "id": str(analytics.id)}
+
+@router.post("/record/batch")
+async def record_events(
+    request: Request,
+    current_user: Optional[Principal] = Depends(get_current_user) # Optional auth
+):
+    items = await parse_batch(request)
+    user_id = current_user.id if current_user else None
+    shared = request_metadata(request)
+
+    results: List[dict] = [None] * len(items)
+    events: List[Analytics] = []
+    positions: List[int] = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Event must be an object")
+            events.append(build_event(AnalyticsRecord(**item), user_id, shared))
+            positions.append(index)
+        except (ValidationError, ValueError) as e:
+            results[index] = {"index": index, "status": "invalid", "error": str(e)}
+
+    await analytics_buffer.submit([to_db(event) for event in events])
+    for index, event in zip(positions, events):
+        results[index] = {"index": index, "status": "accepted", "id": str(event.id)}
+
+    accepted = len(events)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED if accepted == len(results) else status.HTTP_207_MULTI_STATUS,
+        content={"success": accepted > 0 or not results, "accepted": accepted, "results": results}
+    )
+
+@router.get("/profiles/{profile_id}/summary")
+async def get_profile_summary(
+    profile_id: PydanticObjectId,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    granularity: str = "day",
+    current_user: Principal = Depends(get_current_user)
+):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularity must be hour or day")
+
+    profile = await Profile.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if profile.user != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view this profile")
+
+    model, bucket = GRANULARITIES[granularity]
+    end = naive_utc(end) or datetime.utcnow()
+    start = bucket(naive_utc(start) or end - timedelta(days=30))
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    if (end - start) / step > MAX_SUMMARY_BUCKETS[granularity]:
+        raise HTTPException(status_code=400, detail="Requested range is too large for this granularity")
+
+    # Reads only the pre-aggregated rollups, never raw events
+    rollups = model.get_motor_collection().find(
+        {"profile": profile.id, "bucket": {"$gte": start, "$lte": end}},
+        {"_id": 0, "bucket": 1, "eventType": 1, "total": 1}
+    )
+    totals = defaultdict(int)
+    series = defaultdict(lambda: defaultdict(int))
+    async for r in rollups:
+        totals[r["eventType"]] += r["total"]
+        series[r["bucket"]][r["eventType"]] += r["total"]
+
+    # Union of the daily HyperLogLog sketches covering the range (~1.6% standard error)
+    unique_visitors = await unique_counter.estimate("profile", profile.id, start, end)
+
+    return {
+        "success": True,
+        "data": {
+            "profile": str(profile.id),
+            "granularity": granularity,
+            "from": start,
+            "to": end,
+            "totals": totals,
+            "uniqueVisitors": unique_visitors,
+            "series": [{"bucket": b, "counts": series[b]} for b in sorted(series)]
+        }
+    }
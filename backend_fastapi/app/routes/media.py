@@ -0,0 +1,24 @@
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from app.services.storage import storage, is_valid_key
+
+router = APIRouter()
+
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+@router.get("/{key:path}")
+async def get_media(key: str):
+    extension = key.rsplit(".", 1)[-1]
+    if not is_valid_key(key) or extension not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Not found")
+    path = storage.path(key)
+    if not await run_in_threadpool(os.path.isfile, path):
+        raise HTTPException(status_code=404, detail="Not found")
+    # Keys are content hashes, so the bytes behind a URL never change
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[extension],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -1,29 +1,59 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from app.models.order import Order, OrderStatus, ShippingAddress
-from app.models.user import User
 from app.schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderStatusUpdate
-from app.auth.deps import get_current_user
+from app.auth.deps import get_current_user, Principal
+from app.services.pagination import KEYSET_SORT, keyset_filter, keyset_fields, next_page
+from app.services.reads import RowReader, FIELDS_DESCRIPTION
+from app.services.serialization import model_response, rows_response
 from beanie import PydanticObjectId
 import random
 import time
 
 router = APIRouter()
 
+order_rows = RowReader(Order, OrderResponse)
+
 @router.get("/", response_model=List[OrderResponse])
 async def get_orders(
-    current_user: User = Depends(get_current_user),
-    limit: int = 10,
-    skip: int = 0
+    current_user: Principal = Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=100),
+    after: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    selected = order_rows.select(fields)
+    rows = await order_rows.find(
+        {"user": current_user.id, **keyset_filter(after)},
+        sort=KEYSET_SORT,
+        # Deprecated: cost grows with the offset; follow X-Next-Cursor instead
+        skip=0 if after else skip,
+        limit=limit + 1,
+        fields=keyset_fields(selected)
+    )
+    rows, headers = next_page(rows, limit, selected)
+    return rows_response(rows, headers)
+
+@router.get("/{id}", response_model=OrderResponse)
+async def get_order(
+    id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
-    orders = await Order.find(Order.user == current_user.id).sort(-Order.created_at).limit(limit).skip(skip).to_list()
-    # Simple conversion, deeper if needed for ShippingAddress etc
-    return [OrderResponse(**o.dict(), id=str(o.id), user=str(o.user)) for o in orders]
+    selected = order_rows.select(fields)
+    doc = await order_rows.find_one({"_id": id}, selected, also=("user",))
+    if not doc:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    if doc.get("user") != current_user.id and current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return rows_response(order_rows.row(doc, selected))
 
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_in: OrderCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     # Calculate totals
     total_amount = sum(item.quantity * item.unitPrice for item in order_in.items)
@@ -63,4 +93,7 @@ async def create_order(
     )
     await order.save()
     
-    return OrderResponse(**order.dict(), id=str(order.id), user=str(order.user))
+    return model_response(
+        OrderResponse(**order.dict(exclude={"id", "user"}), id=str(order.id), user=str(order.user)),
+        status_code=status.HTTP_201_CREATED
+    )
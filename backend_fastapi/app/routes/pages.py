@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Request, Response, status
+from fastapi.responses import HTMLResponse
+from app.config import settings
+from app.services.compression import negotiate
+from app.services.profile_cache import profile_cache
+from app.services.profile_page import profile_page_cache
+
+router = APIRouter()
+
+NOT_FOUND_PAGE = "<!doctype html><meta charset=utf-8><title>Not found</title><p>This profile isn't available.</p>"
+
+@router.get("/p/{username}", response_class=HTMLResponse)
+async def public_profile_page(username: str, request: Request):
+    entry = await profile_cache.get_by_username(username)
+    if not entry or not entry.isPublic:
+        return HTMLResponse(NOT_FOUND_PAGE, status_code=status.HTTP_404_NOT_FOUND)
+
+    page = profile_page_cache.get(entry)
+    encoding = negotiate(request.headers.get("accept-encoding"), page.bodies)
+    # Each encoding is a different byte sequence, so it needs its own strong ETag
+    etag = page.etag if encoding == "identity" else f'{page.etag[:-1]}-{encoding}"'
+    max_age = settings.PROFILE_MAX_AGE_SECONDS
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.bodies[encoding], media_type="text/html; charset=utf-8", headers=headers)
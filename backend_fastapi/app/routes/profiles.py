@@ -1,46 +1,78 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from app.config import settings
 from app.models.profile import Profile
-from app.models.user import User
-from app.schemas.profile import ProfileCreate, ProfileUpdate, ProfileResponse
-from app.auth.deps import get_current_user
+from app.schemas.profile import ProfileCreate, ProfileUpdate, ProfileResponse, VCardVersion, VCardBatchRequest
+from app.auth.deps import get_current_user, Principal
+from app.services.usernames import username_allocator, is_valid_username
+from app.services.profile_cache import profile_cache, profile_response, CachedProfile
+from app.services.vcard import vcard_cache, build_vcard, vcard_filename
+from app.services.reads import RowReader, FIELDS_DESCRIPTION
+from app.services.versioning import update_owned, version_etag, fieldset_etag
+from app.services.serialization import model_response, rows_response
+from app.services.avatars import (
+    store_avatar, capped_receive, AVATAR_SIZES, MULTIPART_SLACK_BYTES, UploadTooLarge, InvalidImage
+)
 from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
+profile_rows = RowReader(Profile, ProfileResponse)
+
+def cached_profile_response(request: Request, entry: CachedProfile, fields: Optional[List[str]] = None) -> Response:
+    etag = fieldset_etag(entry.etag, fields)
+    headers = {"ETag": etag, "Cache-Control": profile_cache_control(entry)}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if fields is not None:
+        # Cut from the cached model; the cache already saved the database read
+        return rows_response(entry.response.model_dump(mode="json", include={"id", *fields}), headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def profile_cache_control(entry: CachedProfile) -> str:
+    if not entry.isPublic:
+        return "private, no-cache"
+    max_age = settings.PROFILE_MAX_AGE_SECONDS
+    return f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+
+async def vcard_response(request: Request, entry: CachedProfile, version: VCardVersion) -> Response:
+    if not entry.isPublic:
+        raise HTTPException(status_code=403, detail="Profile is private")
+    card = await vcard_cache.get(entry, version)
+    headers = {
+        "ETag": card.etag,
+        "Cache-Control": profile_cache_control(entry),
+        "Content-Disposition": f'attachment; filename="{vcard_filename(entry.response)}"',
+    }
+    if card.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=card.body, media_type="text/vcard; charset=utf-8", headers=headers)
+
 @router.get("/", response_model=List[ProfileResponse])
-async def get_my_profiles(current_user: User = Depends(get_current_user)):
-    profiles = await Profile.find(Profile.user == current_user.id).to_list()
-    return [
-        ProfileResponse(
-            id=str(p.id),
-            user=str(p.user),
-            displayName=p.displayName,
-            username=p.username,
-            bio=p.bio,
-            jobTitle=p.jobTitle,
-            company=p.company,
-            location=p.location,
-            website=p.website,
-            avatar=p.avatar,
-            theme=p.theme,
-            isPublic=p.isPublic,
-            socialLinks=p.socialLinks,
-            contactInfo=p.contactInfo,
-            customFields=p.customFields,
-            settings=p.settings
-        ) for p in profiles
-    ]
+async def get_my_profiles(
+    current_user: Principal = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    selected = profile_rows.select(fields)
+    return rows_response(await profile_rows.find({"user": current_user.id}, fields=selected))
 
 @router.post("/", response_model=ProfileResponse)
-async def create_profile(profile_in: ProfileCreate, current_user: User = Depends(get_current_user)):
+async def create_profile(profile_in: ProfileCreate, current_user: Principal = Depends(get_current_user)):
     profile = Profile(
         user=current_user.id,
         **profile_in.dict()
     )
-    await profile.save()
+    try:
+        await profile.insert()
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username is already taken")
+    username_allocator.add(profile.username)
     
-    return ProfileResponse(
+    return model_response(ProfileResponse(
         id=str(profile.id),
         user=str(profile.user),
         displayName=profile.displayName,
@@ -57,92 +89,166 @@ async def create_profile(profile_in: ProfileCreate, current_user: User = Depends
         contactInfo=profile.contactInfo,
         customFields=profile.customFields,
         settings=profile.settings
+    ))
+
+@router.get("/username-available/{name}")
+async def check_username_available(name: str):
+    if not is_valid_username(name):
+        raise HTTPException(
+            status_code=400,
+            detail="Username must be 3-30 characters: letters, digits, '.', '_' or '-'"
+        )
+    return {"success": True, "username": name, "available": await username_allocator.is_available(name)}
+
+@router.post("/vcards")
+async def export_vcards(batch: VCardBatchRequest, current_user: Principal = Depends(get_current_user)):
+    if len(batch.ids) > settings.VCARD_BATCH_MAX_PROFILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.VCARD_BATCH_MAX_PROFILES} profiles per export"
+        )
+
+    query = {"_id": {"$in": batch.ids}}
+    if current_user.role != "admin":
+        query["$or"] = [{"isPublic": True}, {"user": current_user.id}]
+
+    async def cards():
+        # One card at a time off the cursor; nothing holds the whole set
+        async for profile in Profile.find(query):
+            response = profile_response(profile)
+            photo = await vcard_cache.photo(response) if batch.photos else None
+            yield build_vcard(response, batch.version, photo).encode("utf-8")
+
+    return StreamingResponse(
+        cards(),
+        media_type="text/vcard; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="contacts.vcf"'}
     )
 
+@router.get("/{profile_id}/vcard")
+async def get_profile_vcard(
+    profile_id: PydanticObjectId,
+    request: Request,
+    version: VCardVersion = Query(VCardVersion.v3)
+):
+    entry = await profile_cache.get(profile_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return await vcard_response(request, entry, version)
+
 @router.get("/{profile_id}", response_model=ProfileResponse)
-async def get_profile(profile_id: PydanticObjectId):
-    profile = await Profile.get(profile_id)
-    if not profile:
+async def get_profile(
+    profile_id: PydanticObjectId,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    selected = profile_rows.select(fields)
+    entry = await profile_cache.get(profile_id)
+    if not entry:
         raise HTTPException(status_code=404, detail="Profile not found")
-        
-    return ProfileResponse(
-        id=str(profile.id),
-        user=str(profile.user),
-        displayName=profile.displayName,
-        username=profile.username,
-        bio=profile.bio,
-        jobTitle=profile.jobTitle,
-        company=profile.company,
-        location=profile.location,
-        website=profile.website,
-        avatar=profile.avatar,
-        theme=profile.theme,
-        isPublic=profile.isPublic,
-        socialLinks=profile.socialLinks,
-        contactInfo=profile.contactInfo,
-        customFields=profile.customFields,
-        settings=profile.settings
-    )
+    return cached_profile_response(request, entry, selected)
 
 @router.put("/{profile_id}", response_model=ProfileResponse)
 async def update_profile(
     profile_id: PydanticObjectId, 
     profile_in: ProfileUpdate, 
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    if_match: Optional[str] = Header(None)
+):
+    update_data = profile_in.dict(exclude_unset=True)
+    changes = dict(update_data)
+    if "avatar" in changes:
+        # Pages and vCards prefer the resized variants; drop those of an earlier upload
+        changes["avatarVariants"] = {}
+    try:
+        doc = await update_owned(
+            Profile, profile_id, current_user, changes, profile_rows.projection,
+            if_match=if_match,
+            not_found="Profile not found",
+            forbidden="Not authorized to update this profile"
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username is already taken")
+    # Lookups by a previous username see the id's entry is gone and re-read
+    profile_cache.invalidate(profile_id, doc.get("username"))
+    username_allocator.add(update_data.get("username"))
+
+    return rows_response(profile_rows.row(doc), {"ETag": version_etag(profile_id, doc["version"])})
+    
+@router.post("/{profile_id}/avatar")
+async def upload_avatar(
+    profile_id: PydanticObjectId,
+    request: Request,
+    current_user: Principal = Depends(get_current_user)
 ):
     profile = await Profile.get(profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-        
+
     if profile.user != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to update this profile")
-    
-    update_data = profile_in.dict(exclude_unset=True)
-    await profile.update({"$set": update_data})
-    
-    return ProfileResponse(
-        id=str(profile.id),
-        user=str(profile.user),
-        displayName=profile.displayName, # Should re-fetch or update object locally, but for now simple
-        username=profile.username,
-        bio=profile.bio,
-        jobTitle=profile.jobTitle,
-        company=profile.company,
-        location=profile.location,
-        website=profile.website,
-        avatar=profile.avatar,
-        theme=profile.theme,
-        isPublic=profile.isPublic,
-        socialLinks=profile.socialLinks,
-        contactInfo=profile.contactInfo,
-        customFields=profile.customFields,
-        settings=profile.settings
+
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Avatar must be at most {settings.AVATAR_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
     )
-    
+    max_body = settings.AVATAR_MAX_UPLOAD_BYTES + MULTIPART_SLACK_BYTES
+    # Refuse oversized bodies before reading them when the client says how big they are
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body:
+        raise too_large
+
+    # Chunked bodies carry no length, so the cap is also enforced as the body arrives.
+    # Starlette spools file parts to disk past 1 MB, so the upload never sits in memory whole
+    capped = Request(request.scope, capped_receive(request.receive, max_body))
+    try:
+        form = await capped.form(max_files=1, max_fields=1)
+    except UploadTooLarge:
+        raise too_large
+    try:
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=400, detail="No file uploaded")
+        variants = await store_avatar(upload.file)
+    except UploadTooLarge:
+        raise too_large
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="File is not a supported image")
+    finally:
+        await form.close()
+
+    avatar = variants[str(max(AVATAR_SIZES))]
+    await profile.update({
+        "$set": {"avatar": avatar, "avatarVariants": variants, "updated_at": datetime.utcnow()},
+        "$inc": {"version": 1}
+    })
+    profile_cache.invalidate(profile.id, profile.username)
+
+    return {"success": True, "avatar": avatar, "avatarVariants": variants}
+
 @router.get("/username/{username}", response_model=ProfileResponse)
-async def get_profile_by_username(username: str):
-    profile = await Profile.find_one(Profile.username == username)
-    if not profile:
+async def get_profile_by_username(
+    username: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    selected = profile_rows.select(fields)
+    entry = await profile_cache.get_by_username(username)
+    if not entry:
         raise HTTPException(status_code=404, detail="Profile not found")
         
-    if not profile.isPublic:
+    if not entry.isPublic:
         raise HTTPException(status_code=403, detail="Profile is private")
         
-    return ProfileResponse(
-        id=str(profile.id),
-        user=str(profile.user),
-        displayName=profile.displayName,
-        username=profile.username,
-        bio=profile.bio,
-        jobTitle=profile.jobTitle,
-        company=profile.company,
-        location=profile.location,
-        website=profile.website,
-        avatar=profile.avatar,
-        theme=profile.theme,
-        isPublic=profile.isPublic,
-        socialLinks=profile.socialLinks,
-        contactInfo=profile.contactInfo,
-        customFields=profile.customFields,
-        settings=profile.settings
-    )
+    return cached_profile_response(request, entry, selected)
+
+@router.get("/username/{username}/vcard")
+async def get_profile_vcard_by_username(
+    username: str,
+    request: Request,
+    version: VCardVersion = Query(VCardVersion.v3)
+):
+    entry = await profile_cache.get_by_username(username)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return await vcard_response(request, entry, version)
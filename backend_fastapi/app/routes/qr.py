@@ -1,10 +1,19 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, status, Query
-from app.models.qr import QRCode
+from datetime import datetime, timedelta
+from enum import Enum
+from fastapi import APIRouter, HTTPException, Depends, Header, status, Query, Request, Response
+from app.models.qr import QRCode, ScanHistoryItem
+from app.models.scan import ScanBucket
 from app.models.profile import Profile
-from app.models.user import User
-from app.schemas.qr import QRCreate, QRUpdate, QRResponse
-from app.auth.deps import get_current_user
+from app.schemas.qr import QRCreate, QRUpdate, QRResponse, QRScanHistory
+from app.auth.deps import get_current_user, Principal
+from app.services.qr_render import get_qr_image, MEDIA_TYPES
+from app.services.scan_resolver import scan_resolver
+from app.services.pagination import KEYSET_SORT, keyset_filter, keyset_fields, next_page
+from app.services.reads import RowReader, FIELDS_DESCRIPTION
+from app.services.serialization import model_response, rows_response
+from app.services.versioning import update_owned, version_etag, fieldset_etag
+from app.services.timezones import naive_utc
 from beanie import PydanticObjectId
 import qrcode
 import io
@@ -12,6 +21,12 @@ import base64
 
 router = APIRouter()
 
+qr_rows = RowReader(QRCode, QRResponse)
+
+class ImageFormat(str, Enum):
+    PNG = "png"
+    SVG = "svg"
+
 async def generate_qr_data(type: str, data: dict, profile_username: str = None) -> str:
     # Simplified version of logic from express controller
     if type == 'profile':
@@ -22,17 +37,28 @@ async def generate_qr_data(type: str, data: dict, profile_username: str = None)
 
 @router.get("/", response_model=List[QRResponse])
 async def get_qr_codes(
-    current_user: User = Depends(get_current_user),
-    limit: int = 10,
-    skip: int = 0
+    current_user: Principal = Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=100),
+    after: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
-    qrcodes = await QRCode.find(QRCode.user == current_user.id).limit(limit).skip(skip).to_list()
-    return [QRResponse(**q.dict(), id=str(q.id), user=str(q.user), profile=str(q.profile)) for q in qrcodes]
+    selected = qr_rows.select(fields)
+    rows = await qr_rows.find(
+        {"user": current_user.id, **keyset_filter(after)},
+        sort=KEYSET_SORT,
+        # Deprecated: cost grows with the offset; follow X-Next-Cursor instead
+        skip=0 if after else skip,
+        limit=limit + 1,
+        fields=keyset_fields(selected)
+    )
+    rows, headers = next_page(rows, limit, selected)
+    return rows_response(rows, headers)
 
 @router.post("/", response_model=QRResponse, status_code=status.HTTP_201_CREATED)
 async def create_qr_code(
     qr_in: QRCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     profile = await Profile.get(PydanticObjectId(qr_in.profile))
     if not profile:
@@ -50,27 +76,61 @@ async def create_qr_code(
     )
     await qr_code.save()
     
-    return QRResponse(**qr_code.dict(), id=str(qr_code.id), user=str(qr_code.user), profile=str(qr_code.profile))
+    return model_response(
+        QRResponse(**qr_code.dict(exclude={"id", "user", "profile"}), id=str(qr_code.id), user=str(qr_code.user), profile=str(qr_code.profile)),
+        status_code=status.HTTP_201_CREATED
+    )
 
 @router.get("/{id}", response_model=QRResponse)
 async def get_qr_code(
     id: PydanticObjectId,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    selected = qr_rows.select(fields)
+    doc = await qr_rows.find_one({"_id": id}, selected, also=("user", "version"))
+    if not doc:
+        raise HTTPException(status_code=404, detail="QR Code not found")
+    
+    if doc.get("user") != current_user.id and current_user.role != 'admin':
+         raise HTTPException(status_code=403, detail="Not authorized")
+         
+    etag = fieldset_etag(version_etag(id, doc.get("version", 0)), selected)
+    return rows_response(qr_rows.row(doc, selected), {"ETag": etag})
+
+@router.get("/{id}/image.{fmt}")
+async def get_qr_image_file(
+    id: PydanticObjectId,
+    fmt: ImageFormat,
+    request: Request,
+    current_user: Principal = Depends(get_current_user)
 ):
     qr = await QRCode.get(id)
     if not qr:
         raise HTTPException(status_code=404, detail="QR Code not found")
-    
+
     if qr.user != current_user.id and current_user.role != 'admin':
          raise HTTPException(status_code=403, detail="Not authorized")
-         
-    return QRResponse(**qr.dict(), id=str(qr.id), user=str(qr.user), profile=str(qr.profile))
 
-@router.put("/{id}", response_model=QRResponse)
-async def update_qr_code(
+    try:
+        key, data = await get_qr_image(qr, fmt.value)
+    except ValueError as e:
+        # Data too long for the error correction level, or a color saved before validation
+        raise HTTPException(status_code=422, detail=f"QR code can't be rendered: {e}")
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=data, media_type=MEDIA_TYPES[fmt.value], headers=headers)
+
+@router.get("/{id}/scans", response_model=QRScanHistory)
+async def get_qr_scans(
     id: PydanticObjectId,
-    qr_in: QRUpdate,
-    current_user: User = Depends(get_current_user)
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(500, le=5000),
+    current_user: Principal = Depends(get_current_user)
 ):
     qr = await QRCode.get(id)
     if not qr:
@@ -78,16 +138,55 @@ async def update_qr_code(
 
     if qr.user != current_user.id and current_user.role != 'admin':
          raise HTTPException(status_code=403, detail="Not authorized")
-    
+
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(days=7)
+    buckets = ScanBucket.find(
+        ScanBucket.qrCode == qr.id,
+        ScanBucket.bucket >= start.replace(minute=0, second=0, microsecond=0),
+        ScanBucket.bucket <= end
+    ).sort(-ScanBucket.bucket)
+
+    total = 0
+    scans = []
+    async for b in buckets:
+        total += b.total
+        for i in range(len(b.offsets) - 1, -1, -1):
+            timestamp = b.bucket + timedelta(seconds=b.offsets[i])
+            if len(scans) >= limit or not (start <= timestamp <= end):
+                continue
+            scans.append(ScanHistoryItem(
+                timestamp=timestamp,
+                ipAddress=b.ipAddress[i],
+                userAgent=b.userAgent[i],
+                device=b.device[i],
+                location=b.location[i]
+            ))
+
+    scans.sort(key=lambda s: s.timestamp, reverse=True)
+    return QRScanHistory(totalScans=total, scans=scans)
+
+@router.put("/{id}", response_model=QRResponse)
+async def update_qr_code(
+    id: PydanticObjectId,
+    qr_in: QRUpdate,
+    current_user: Principal = Depends(get_current_user),
+    if_match: Optional[str] = Header(None)
+):
     update_data = qr_in.dict(exclude_unset=True)
-    await qr.update({"$set": update_data})
-    
-    return QRResponse(**qr.dict(), id=str(qr.id), user=str(qr.user), profile=str(qr.profile))
+    doc = await update_owned(
+        QRCode, id, current_user, update_data, qr_rows.projection,
+        if_match=if_match,
+        not_found="QR Code not found"
+    )
+    scan_resolver.invalidate(id)
+
+    return rows_response(qr_rows.row(doc), {"ETag": version_etag(id, doc["version"])})
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_qr_code(
     id: PydanticObjectId,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     qr = await QRCode.get(id)
     if not qr:
@@ -97,4 +196,5 @@ async def delete_qr_code(
          raise HTTPException(status_code=403, detail="Not authorized")
          
     await qr.delete()
+    scan_resolver.invalidate(qr.id)
     return None
@@ -0,0 +1,36 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import RedirectResponse
+from app.services.scan_resolver import scan_resolver, decode_short_id
+from app.services.scan_counter import scan_counter
+
+router = APIRouter()
+
+REDIRECT_SCHEMES = ("http://", "https://", "mailto:", "tel:", "sms:")
+
+@router.get("/s/{short_id}")
+async def scan_redirect(short_id: str, request: Request):
+    qr_id = decode_short_id(short_id)
+    if qr_id is None:
+        raise HTTPException(status_code=404, detail="QR Code not found")
+
+    target = await scan_resolver.resolve(qr_id)
+    if target is None or not target.isActive:
+        raise HTTPException(status_code=404, detail="QR Code not found")
+
+    if target.expiresAt and target.expiresAt < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="QR Code has expired")
+
+    if not target.qrData.lower().startswith(REDIRECT_SCHEMES):
+        raise HTTPException(status_code=404, detail="QR Code has no redirect target")
+
+    scan_counter.record(
+        qr_id,
+        ipAddress=request.client.host if request.client else None,
+        userAgent=request.headers.get("user-agent")
+    )
+    return RedirectResponse(
+        target.qrData,
+        status_code=status.HTTP_302_FOUND,
+        headers={"Cache-Control": "no-store"}
+    )
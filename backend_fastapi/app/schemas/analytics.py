@@ -19,6 +19,3 @@ class AnalyticsResponse(BaseModel):
     eventType: str
     eventAction: str
     created_at: datetime
-
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
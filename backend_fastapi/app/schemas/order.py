@@ -28,6 +28,3 @@ class OrderResponse(BaseModel):
     trackingNumber: Optional[str] = None
     estimatedDelivery: Optional[datetime] = None
     created_at: datetime
-
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
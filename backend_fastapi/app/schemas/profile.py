@@ -1,5 +1,7 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
+from enum import Enum
 from pydantic import BaseModel
+from beanie import PydanticObjectId
 from app.models.profile import SocialLinks, ContactInfo, CustomField, ProfileSettings
 
 class ProfileCreate(BaseModel):
@@ -34,9 +36,20 @@ class ProfileResponse(BaseModel):
     location: Optional[str] = None
     website: Optional[str] = None
     avatar: Optional[str] = None
+    avatarVariants: Optional[Dict[str, str]] = None
     theme: str
     isPublic: bool
     socialLinks: Optional[SocialLinks] = None
     contactInfo: Optional[ContactInfo] = None
     customFields: Optional[List[CustomField]] = None
     settings: Optional[ProfileSettings] = None
+    version: int = 0
+
+class VCardVersion(str, Enum):
+    v3 = "3.0"
+    v4 = "4.0"
+
+class VCardBatchRequest(BaseModel):
+    ids: List[PydanticObjectId]
+    version: VCardVersion = VCardVersion.v3
+    photos: bool = False
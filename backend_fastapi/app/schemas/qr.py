@@ -1,20 +1,37 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+from PIL import ImageColor
+from beanie import PydanticObjectId
 from datetime import datetime
 from app.schemas.profile import ProfileResponse
 from app.schemas.user import UserResponse
+from app.models.qr import ScanHistoryItem, QRSettings, QR_MIN_SIZE, QR_MAX_SIZE, QR_MAX_MARGIN
+
+class QRSettingsIn(QRSettings):
+    size: int = Field(200, ge=QR_MIN_SIZE, le=QR_MAX_SIZE)
+    margin: int = Field(4, ge=0, le=QR_MAX_MARGIN)
+
+    @field_validator("foregroundColor", "backgroundColor")
+    @classmethod
+    def color_renders(cls, value: str) -> str:
+        # The same parser the PNG renderer uses, so anything accepted here can be drawn
+        try:
+            ImageColor.getrgb(value)
+        except ValueError:
+            raise ValueError("Must be a CSS color such as #1a2b3c or rgb(26, 43, 60)")
+        return value
 
 class QRCreate(BaseModel):
     name: str
     type: str = "profile"
     profile: str # Profile ID
     data: Dict[str, Any] # Contains content for generation
-    settings: Optional[Dict[str, Any]] = None
+    settings: Optional[QRSettingsIn] = None
 
 class QRUpdate(BaseModel):
     name: Optional[str] = None
     isActive: Optional[bool] = None
-    settings: Optional[Dict[str, Any]] = None
+    settings: Optional[QRSettingsIn] = None
     data: Optional[Dict[str, Any]] = None
 
 class QRResponse(BaseModel):
@@ -29,7 +46,14 @@ class QRResponse(BaseModel):
     scanCount: int
     isActive: bool
     settings: Dict[str, Any]
+    version: int = 0
     created_at: datetime
-    
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
+
+class PrintBatchRequest(BaseModel):
+    orderId: Optional[PydanticObjectId] = None
+    qrIds: Optional[List[PydanticObjectId]] = None
+    format: str = "png"
+
+class QRScanHistory(BaseModel):
+    totalScans: int
+    scans: List[ScanHistoryItem]
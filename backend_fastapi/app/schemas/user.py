@@ -24,9 +24,6 @@ class UserResponse(BaseModel):
     status: str
     permissions: List[str]
     created_at: datetime
-    
-    class Config:
-        json_encoders = {datetime: lambda v: v.isoformat()}
 
 class Token(BaseModel):
     access_token: str
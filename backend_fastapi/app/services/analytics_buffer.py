@@ -0,0 +1,253 @@
+import asyncio
+import fcntl
+import glob
+import logging
+import os
+import time
+from collections import deque
+from threading import Lock
+from typing import IO, Deque, List, Optional
+
+from bson import json_util
+from fastapi.concurrency import run_in_threadpool
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.config import settings
+from app.models.analytics import Analytics
+from app.services.rollups import rollup_writer
+from app.services.unique_counts import unique_counter
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class SegmentLog:
+    """Append-only NDJSON segments holding events that couldn't reach Mongo.
+
+    Every worker shares the directory. The writer of a segment holds an
+    exclusive flock on it for as long as the file is open, so a ``.open``
+    segment whose lock can be taken belongs to a process that has died, and
+    a closed segment is replayed only by whoever holds its lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._file = None
+        self._path: Optional[str] = None
+        self._lock = Lock()
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"segment-{time.time_ns()}-{os.getpid()}.ndjson"
+        self._path = os.path.join(self.directory, name)
+        # Locked before it gets a name other workers look for
+        staging = os.path.join(self.directory, "." + name)
+        self._file = open(staging, "a", encoding="utf-8")
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        os.replace(staging, self._path + ".open")
+
+    def rotate(self) -> None:
+        with self._lock:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        # A segment only becomes visible to replay once it is closed
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        os.replace(self._path + ".open", self._path)
+        self._file.close()
+        self._file = self._path = None
+
+    def append(self, docs: List[dict]) -> None:
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write("".join(json_util.dumps(doc) + "\n" for doc in docs))
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    @staticmethod
+    def claim(path: str) -> Optional[IO[str]]:
+        """Open and lock a segment, or None if another process holds it or it is gone."""
+        try:
+            f = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The holder may have removed or renamed it before letting go
+            if os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                raise FileNotFoundError(path)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    def segments(self) -> List[str]:
+        with self._lock:
+            own = self._path + ".open" if self._path else None
+            for leftover in glob.glob(os.path.join(self.directory, "segment-*.ndjson.open")):
+                if leftover == own:
+                    continue
+                f = self.claim(leftover)
+                if f is None:
+                    continue  # still being written by a live worker
+                with f:
+                    # Its writer died; it is complete up to its last full line
+                    os.replace(leftover, leftover[: -len(".open")])
+            return sorted(glob.glob(os.path.join(self.directory, "segment-*.ndjson")))
+
+    @staticmethod
+    def read(f: IO[str]) -> List[dict]:
+        docs = []
+        for line in f:
+            try:
+                docs.append(json_util.loads(line))
+            except ValueError:
+                # Torn final write from a crash
+                logger.warning("Skipping unreadable line in %s", f.name)
+        return docs
+
+
+class AnalyticsBuffer:
+    """Bounded write-behind queue for analytics events.
+
+    Requests only enqueue; a background task drains batches into Mongo.
+    When the queue is full or the database is unreachable, events are
+    appended to local segment files and replayed once writes succeed again.
+    """
+
+    def __init__(self, max_events: int, batch_size: int, interval: float, spill: SegmentLog):
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.interval = interval
+        self.spill = spill
+        self._queue: Deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._backoff = 0.0
+        self._has_spilled = True  # check for segments left by a previous run
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def submit(self, docs: List[dict]) -> None:
+        if len(self._queue) + len(docs) > self.max_events:
+            try:
+                await self._spill(docs)
+            except OSError:
+                # Analytics are best effort; never fail the request over them
+                logger.exception("Dropping %d analytics events: queue full and spill failed", len(docs))
+            return
+        self._queue.extend(docs)
+        if len(self._queue) >= self.batch_size and not self._backoff:
+            self._wakeup.set()
+
+    async def _spill(self, docs: List[dict]) -> None:
+        await run_in_threadpool(self.spill.append, docs)
+        self._has_spilled = True
+
+    async def _insert(self, docs: List[dict]) -> None:
+        try:
+            await Analytics.get_motor_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # _ids are assigned up front, so duplicates mean an earlier replay already landed
+            write_errors = e.details.get("writeErrors", [])
+            errors = [err for err in write_errors if err.get("code") != DUPLICATE_KEY]
+            if errors:
+                logger.error("Dropping %d analytics events rejected by Mongo: %s", len(errors), errors[0].get("errmsg"))
+            rejected = {err["index"] for err in write_errors}
+            docs = [doc for i, doc in enumerate(docs) if i not in rejected]
+        # Only events stored by this write are counted, so replays never double-count
+        rollup_writer.add(docs)
+        unique_counter.add_events(docs)
+
+    async def _drain(self) -> None:
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            try:
+                await self._insert(batch)
+            except PyMongoError:
+                # Database unavailable: everything queued goes to disk until it recovers
+                batch.extend(self._queue)
+                self._queue.clear()
+                try:
+                    await self._spill(batch)
+                except OSError:
+                    # Nowhere to put them either; keep them queued for the next attempt
+                    self._queue.extendleft(reversed(batch))
+                raise
+
+    async def _replay(self) -> None:
+        await run_in_threadpool(self.spill.rotate)
+        for path in await run_in_threadpool(self.spill.segments):
+            claimed = await run_in_threadpool(SegmentLog.claim, path)
+            if claimed is None:
+                continue  # another worker is replaying it
+            try:
+                docs = await run_in_threadpool(SegmentLog.read, claimed)
+                for start in range(0, len(docs), self.batch_size):
+                    await self._insert(docs[start:start + self.batch_size])
+                os.remove(path)
+            finally:
+                claimed.close()
+        self._has_spilled = False
+
+    async def flush(self) -> None:
+        try:
+            await self._drain()
+            if self._has_spilled:
+                await self._replay()
+        finally:
+            await rollup_writer.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval + self._backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                self._backoff = 0.0
+            except PyMongoError:
+                self._backoff = min(MAX_BACKOFF_SECONDS, max(1.0, self._backoff * 2))
+                logger.warning("Analytics writes failing; spilling to disk, retry in %.0fs", self._backoff)
+            except Exception:
+                # Spill file trouble (disk full, permissions): the task must outlive it
+                self._backoff = min(MAX_BACKOFF_SECONDS, max(1.0, self._backoff * 2))
+                logger.exception("Analytics flush failed; retry in %.0fs", self._backoff)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._drain()
+        except PyMongoError:
+            pass
+        await rollup_writer.flush()
+        await run_in_threadpool(self.spill.rotate)
+
+
+analytics_buffer = AnalyticsBuffer(
+    max_events=settings.ANALYTICS_BUFFER_MAX_EVENTS,
+    batch_size=settings.ANALYTICS_FLUSH_BATCH_SIZE,
+    interval=settings.ANALYTICS_FLUSH_INTERVAL_SECONDS,
+    spill=SegmentLog(settings.ANALYTICS_SPILL_DIR, settings.ANALYTICS_SEGMENT_MAX_BYTES),
+)
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+from typing import BinaryIO, Dict, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps
+from starlette.types import Message, Receive
+
+from app.config import settings
+from app.services.storage import storage
+from app.services.workers import get_process_pool
+
+AVATAR_SIZES = (64, 256, 512)
+CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_SLACK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def capped_receive(receive: Receive, max_bytes: int) -> Receive:
+    """Wrap an ASGI receive so reading the body fails with UploadTooLarge past max_bytes."""
+    received = 0
+
+    async def receive_capped() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise UploadTooLarge()
+        return message
+
+    return receive_capped
+
+
+def spool_to_disk(source: BinaryIO, directory: str, max_bytes: int) -> Tuple[str, str]:
+    """Copy an upload to a temp file chunk by chunk; returns (path, sha256 hex)."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=directory, prefix="avatar-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def resize_avatar(path: str, sizes: Tuple[int, ...], max_pixels: int) -> Dict[int, bytes]:
+    """Square-crop and encode every size as WebP. Runs in a worker process."""
+    try:
+        with Image.open(path) as image:
+            # The header is enough to refuse decompression bombs before decoding
+            if image.width * image.height > max_pixels:
+                raise InvalidImage("Image dimensions are too large")
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            variants = {}
+            for size in sizes:
+                resized = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                out = io.BytesIO()
+                resized.save(out, format="WEBP", quality=82, method=4)
+                variants[size] = out.getvalue()
+            return variants
+    except (OSError, Image.DecompressionBombError, ValueError) as e:
+        raise InvalidImage(str(e)) from e
+
+
+def _content_key(data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return f"avatars/{digest[:2]}/{digest}.webp"
+
+
+def _store_variants(variants: Dict[int, bytes]) -> Dict[str, str]:
+    keys = {}
+    for size, data in variants.items():
+        key = _content_key(data)
+        # Same bytes, same key: identical avatars are stored once
+        if not storage.exists(key):
+            storage.write(key, data)
+        keys[str(size)] = key
+    return keys
+
+
+def _read_manifest(key: str):
+    return json.loads(storage.read(key)) if storage.exists(key) else None
+
+
+async def store_avatar(source: BinaryIO) -> Dict[str, str]:
+    """Process an uploaded image; returns {size: url} for every variant."""
+    path, source_digest = await run_in_threadpool(
+        spool_to_disk, source, storage.scratch_dir(), settings.AVATAR_MAX_UPLOAD_BYTES
+    )
+    try:
+        # Re-uploading the same file skips decoding entirely
+        manifest_key = f"avatars/sources/{source_digest}.json"
+        keys = await run_in_threadpool(_read_manifest, manifest_key)
+        if keys is None:
+            loop = asyncio.get_running_loop()
+            variants = await loop.run_in_executor(
+                get_process_pool(), resize_avatar, path, AVATAR_SIZES, settings.AVATAR_MAX_PIXELS
+            )
+            keys = await run_in_threadpool(_store_variants, variants)
+            await run_in_threadpool(storage.write, manifest_key, json.dumps(keys).encode("utf-8"))
+    finally:
+        await run_in_threadpool(os.unlink, path)
+    return {size: storage.url(key) for size, key in keys.items()}
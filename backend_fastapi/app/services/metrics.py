@@ -0,0 +1,292 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.convertors import PathConvertor
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth.security import password_queue_depth
+from app.services.pool_stats import pool_stats
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Requests no route matched share one label instead of one series per probed URL
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Series values sharded per thread.
+
+    Each thread only ever writes its own shard, so recording takes no lock;
+    the lock guards the one-time registration of a thread's shard. A scrape
+    copies every shard (dict.copy is atomic under the GIL) and sums them, so
+    it may miss an update that lands while it runs, never corrupt one.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> Dict[Tuple[str, ...], list]:
+        with self._lock:
+            shards = [shard.copy() for shard in self._shards]
+        merged: Dict[Tuple[str, ...], list] = {}
+        for shard in shards:
+            for labels, values in shard.items():
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return merged
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, values in sorted(self._merged().items()):
+            lines.extend(self._samples(labels, values))
+        return lines
+
+    def _samples(self, labels: Tuple[str, ...], values: list) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0]
+        values[0] += amount
+
+    def _samples(self, labels, values):
+        return [f"{self.name}{_labels(self.label_names, labels)} {values[0]}"]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            # One count per bucket, the +Inf overflow, then the sum
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def _samples(self, labels, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {values[-1]}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """A single unlabelled value read from its owner at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self._read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", f"{self.name} {self._read()}"]
+
+
+REGISTRY: List[_Metric] = []
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time from request to the last body byte sent.", ("method", "route")
+)
+mongo_latency = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips, failed ones included.",
+    ("collection", "command"), MONGO_BUCKETS
+)
+mongo_failures = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error.", ("collection", "command")
+)
+mongo_documents = Counter(
+    "mongodb_documents_returned_total", "Documents sent back by find, getMore, aggregate and findAndModify.",
+    ("collection", "command")
+)
+password_queue = CallbackGauge(
+    "password_hash_pending", "bcrypt hashes and verifications queued or running; 503s start at PASSWORD_HASH_MAX_PENDING.",
+    password_queue_depth
+)
+
+
+def _pool_gauges() -> List[str]:
+    lines = []
+    snapshot = pool_stats.snapshot()
+    for name, key, help in (
+        ("mongodb_pool_open_connections", "open", "Connections open to each server."),
+        ("mongodb_pool_checked_out_connections", "checkedOut", "Connections in use by an operation."),
+    ):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{_labels(('server',), (address,))} {pool[key]}" for address, pool in snapshot.items()]
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_pool_gauges())
+    return "\n".join(lines) + "\n"
+
+
+def route_template(scope: Scope) -> str:
+    """The full path template of the route the router matched.
+
+    The route's own path_format is relative to its router on FastAPI versions
+    that resolve included routers lazily, so the include_router prefix is
+    taken from the concrete path: everything before the segments the
+    template itself matched (a ``:path`` parameter may span several).
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return UNMATCHED_ROUTE
+    convertors = getattr(route, "param_convertors", {})
+    segments = path_format.count("/") + sum(
+        str(value).count("/")
+        for name, value in scope.get("path_params", {}).items()
+        if isinstance(convertors.get(name), PathConvertor)
+    )
+    path = scope["path"]
+    cut = len(path)
+    for _ in range(segments):
+        cut = path.rfind("/", 0, cut)
+        if cut < 0:
+            return path_format
+    return path[:cut] + path_format
+
+
+class MetricsMiddleware:
+    """Counts requests and times them, labelled by the matched route's path template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            template = route_template(scope)
+            method = scope["method"]
+            http_requests.inc(method, template, str(status_code))
+            http_latency.observe(time.perf_counter() - started, method, template)
+
+
+def _returned(command_name: str, reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") is not None else 0
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Per-collection, per-command latency from pymongo's command monitoring.
+
+    Only the started event names the collection. pymongo publishes an
+    operation's started and finished events from the thread running it, so
+    the pending map is per thread and needs no lock either.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _pending(self) -> dict:
+        try:
+            return self._local.pending
+        except AttributeError:
+            pending = self._local.pending = {}
+            return pending
+
+    def started(self, event):
+        command = event.command
+        name = event.command_name
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        # Database-level commands (ping, aggregate: 1, ...) carry no collection name
+        self._pending()[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def _collection(self, event) -> str:
+        return self._pending().pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        collection = self._collection(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+        returned = _returned(event.command_name, event.reply)
+        if returned:
+            mongo_documents.inc(collection, event.command_name, amount=returned)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_failures.inc(collection, event.command_name)
+
+
+command_metrics = CommandMetrics()
@@ -0,0 +1,78 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.services.timezones import naive_utc
+
+# Newest first; _id breaks ties between documents created in the same millisecond
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(created_at: datetime, doc_id) -> str:
+    # Mongo keeps milliseconds, so that is exactly what a stored created_at holds
+    millis = (naive_utc(created_at) - _EPOCH) // timedelta(milliseconds=1)
+    raw = millis.to_bytes(8, "big", signed=True) + ObjectId(str(doc_id)).binary
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        raise ValueError("Malformed cursor")
+    if len(raw) != 20:
+        raise ValueError("Malformed cursor")
+    millis = int.from_bytes(raw[:8], "big", signed=True)
+    try:
+        created_at = _EPOCH + timedelta(milliseconds=millis)
+    except OverflowError:
+        # Tampered: no stored datetime is that far out
+        raise ValueError("Malformed cursor")
+    return created_at, ObjectId(raw[8:])
+
+
+def keyset_filter(after: Optional[str]) -> dict:
+    """Query clause selecting documents strictly after the cursor in KEYSET_SORT order."""
+    if not after:
+        return {}
+    try:
+        created_at, doc_id = decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": doc_id}},
+    ]}
+
+
+def keyset_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """A sparse fieldset plus created_at, which the next cursor is built from."""
+    if fields is None or "created_at" in fields:
+        return fields
+    return fields + ["created_at"]
+
+
+def next_page(
+    rows: List[dict], limit: int, fields: Optional[List[str]] = None
+) -> Tuple[List[dict], Dict[str, str]]:
+    """Trim the one-extra lookahead row; the headers advertise the next cursor if there is more.
+
+    Rows read with keyset_fields(fields) lose the created_at that wasn't asked for.
+    """
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["created_at"], last["id"])
+    if fields is not None and "created_at" not in fields:
+        for row in rows:
+            del row["created_at"]
+    return rows, headers
@@ -0,0 +1,100 @@
+from collections import Counter
+from threading import Lock
+from typing import Dict
+
+from pymongo import monitoring
+
+
+class _ServerPool:
+    __slots__ = ("open", "checked_out", "checkouts", "wait_seconds", "max_wait_seconds", "failures", "cleared")
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.failures: Counter = Counter()
+        self.cleared = 0
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Per-server connection pool gauges and checkout counters from pymongo's CMAP events.
+
+    Events arrive on pymongo's threads, so updates take a lock; each one is a
+    handful of integer operations.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, _ServerPool] = {}
+        self._lock = Lock()
+
+    def _pool(self, address) -> _ServerPool:
+        key = "%s:%s" % address
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _ServerPool()
+        return pool
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address).open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._pool(event.address).open -= 1
+
+    def connection_checked_out(self, event):
+        waited = event.duration or 0.0
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.checked_out += 1
+            pool.checkouts += 1
+            pool.wait_seconds += waited
+            pool.max_wait_seconds = max(pool.max_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pool(event.address).checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._pool(event.address).failures[event.reason] += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address).cleared += 1
+
+    # Nothing to count for these
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                address: {
+                    "open": pool.open,
+                    "checkedOut": pool.checked_out,
+                    "checkouts": pool.checkouts,
+                    "avgWaitMs": round(pool.wait_seconds / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                    "maxWaitMs": round(pool.max_wait_seconds * 1000, 3),
+                    "checkoutFailures": dict(pool.failures),
+                    "cleared": pool.cleared,
+                }
+                for address, pool in self._pools.items()
+            }
+
+
+pool_stats = PoolStats()
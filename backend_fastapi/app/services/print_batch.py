@@ -0,0 +1,122 @@
+import asyncio
+import csv
+import hashlib
+import io
+import re
+import zipfile
+from typing import AsyncIterable, AsyncIterator, Dict, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.qr_render import load_logo, render_cache, render_key, render_params, render_qr
+from app.services.workers import get_process_pool, worker_count
+
+MANIFEST_FIELDS = ["file", "qrId", "name", "profile", "qrData", "sha256", "error"]
+
+
+class _ZipStream:
+    # Write-only sink: zipfile falls back to data descriptors when it can't seek,
+    # so each entry can be handed to the client as soon as it's written
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", value or "").strip("-").lower()[:40] or "qr"
+
+
+async def _logo_bytes(logo: Optional[str], logos: Dict[str, Optional[bytes]]) -> Optional[bytes]:
+    if not logo:
+        return None
+    if logo not in logos:
+        try:
+            logos[logo] = await load_logo(logo)
+        except (httpx.HTTPError, ValueError):
+            logos[logo] = None
+    return logos[logo]
+
+
+async def _render(qr, fmt: str, logos: Dict[str, Optional[bytes]]):
+    try:
+        params = render_params(qr.settings.dict())
+        key = render_key(qr.qrData, params, qr.logo, fmt)
+        data = await render_cache.get(key)
+        if data is None:
+            logo = await _logo_bytes(qr.logo, logos)
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(get_process_pool(), render_qr, qr.qrData, params, fmt, logo)
+            if logo is not None or not qr.logo:
+                # Disk only: a batch of thousands would flush the hot in-memory LRU
+                await run_in_threadpool(render_cache.write_disk, key, data)
+    except Exception as e:
+        # One code that can't be drawn (bad color, data past capacity) must not cut the archive short
+        return qr, None, f"{type(e).__name__}: {e}"
+    return qr, data, ""
+
+
+async def stream_print_batch(qrcodes: AsyncIterable, fmt: str) -> AsyncIterator[bytes]:
+    sink = _ZipStream()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    manifest = io.StringIO()
+    writer = csv.DictWriter(manifest, fieldnames=MANIFEST_FIELDS)
+    writer.writeheader()
+
+    logos: Dict[str, Optional[bytes]] = {}
+    window = worker_count() * 4
+    pending = set()
+    index = 0
+    source = qrcodes.__aiter__()
+    exhausted = False
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < window:
+                try:
+                    qr = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(_render(qr, fmt, logos)))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                qr, data, error = task.result()
+                name = digest = ""
+                if data is not None:
+                    index += 1
+                    name = f"{index:05d}-{_slug(qr.name)}-{qr.id}.{fmt}"
+                    archive.writestr(name, data)
+                    digest = hashlib.sha256(data).hexdigest()
+                writer.writerow({
+                    "file": name,
+                    "qrId": str(qr.id),
+                    "name": qr.name,
+                    "profile": str(qr.profile),
+                    "qrData": qr.qrData,
+                    "sha256": digest,
+                    "error": error,
+                })
+                yield sink.drain()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    archive.writestr("manifest.csv", manifest.getvalue().encode("utf-8"), compress_type=zipfile.ZIP_DEFLATED)
+    archive.close()
+    yield sink.drain()
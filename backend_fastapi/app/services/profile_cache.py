@@ -0,0 +1,105 @@
+from typing import NamedTuple, Optional
+
+from beanie import PydanticObjectId
+
+from app.config import settings
+from app.database import public_collection
+from app.models.profile import Profile
+from app.schemas.profile import ProfileResponse
+from app.services.cache import TTLCache
+from app.services.versioning import version_etag
+
+
+class CachedProfile(NamedTuple):
+    response: ProfileResponse
+    body: bytes
+    etag: str
+
+    @property
+    def id(self) -> str:
+        return self.response.id
+
+    @property
+    def isPublic(self) -> bool:
+        return self.response.isPublic
+
+
+def profile_response(profile: Profile) -> ProfileResponse:
+    return ProfileResponse(
+        id=str(profile.id),
+        user=str(profile.user),
+        displayName=profile.displayName,
+        username=profile.username,
+        bio=profile.bio,
+        jobTitle=profile.jobTitle,
+        company=profile.company,
+        location=profile.location,
+        website=profile.website,
+        avatar=profile.avatar,
+        avatarVariants=profile.avatarVariants,
+        theme=profile.theme,
+        isPublic=profile.isPublic,
+        socialLinks=profile.socialLinks,
+        contactInfo=profile.contactInfo,
+        customFields=profile.customFields,
+        settings=profile.settings,
+        version=profile.version
+    )
+
+
+def profile_etag(profile: Profile) -> str:
+    # Every write bumps version, so this also serves as the If-Match token for updates
+    return version_etag(profile.id, profile.version)
+
+
+class ProfileCache:
+    """Serialized public profiles, looked up by id or username.
+
+    Entries are invalidated on write in this process; other workers see the
+    change within PROFILE_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_items: int, ttl: float):
+        self.by_id = TTLCache(max_items, ttl)
+        self.ids_by_username = TTLCache(max_items, ttl)
+        self._generation = 0
+
+    def _store(self, profile: Profile, generation: int) -> CachedProfile:
+        response = profile_response(profile)
+        entry = CachedProfile(response, response.json().encode("utf-8"), profile_etag(profile))
+        # An invalidation while we were reading means the document may already be old
+        if generation == self._generation:
+            self.by_id.set(profile.id, entry)
+            if profile.username:
+                self.ids_by_username.set(profile.username, profile.id)
+        return entry
+
+    async def _load(self, query: dict, generation: int) -> Optional[CachedProfile]:
+        doc = await public_collection(Profile).find_one(query)
+        return self._store(Profile.model_validate(doc), generation) if doc else None
+
+    async def get(self, profile_id: PydanticObjectId) -> Optional[CachedProfile]:
+        entry = self.by_id.get(profile_id)
+        if entry is not None:
+            return entry
+        generation = self._generation
+        return await self._load({"_id": profile_id}, generation)
+
+    async def get_by_username(self, username: str) -> Optional[CachedProfile]:
+        profile_id = self.ids_by_username.get(username)
+        if profile_id is not None:
+            entry = self.by_id.get(profile_id)
+            if entry is not None and entry.response.username == username:
+                return entry
+        generation = self._generation
+        return await self._load({"username": username}, generation)
+
+    def invalidate(self, profile_id: PydanticObjectId, *usernames: Optional[str]) -> None:
+        self._generation += 1
+        self.by_id.pop(profile_id)
+        for username in usernames:
+            if username:
+                self.ids_by_username.pop(username)
+
+
+profile_cache = ProfileCache(settings.PROFILE_CACHE_SIZE, settings.PROFILE_CACHE_TTL_SECONDS)
@@ -0,0 +1,143 @@
+import html
+from string import Template
+from typing import Dict, NamedTuple, Optional
+
+from app.config import settings
+from app.schemas.profile import ProfileResponse
+from app.services.cache import TTLCache
+from app.services.compression import compressed_variants
+from app.services.profile_cache import CachedProfile
+from app.services.storage import storage
+
+LINK_SCHEMES = ("http://", "https://")
+
+SOCIAL_LABELS = {
+    "website": "Website",
+    "linkedin": "LinkedIn",
+    "twitter": "Twitter",
+    "instagram": "Instagram",
+    "facebook": "Facebook",
+    "youtube": "YouTube",
+    "github": "GitHub",
+}
+
+# Parsed once at import; rendering is plain substitution of escaped fragments
+PAGE = Template("""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>$title</title>
+<meta name="description" content="$description">
+<meta property="og:title" content="$title">
+<meta property="og:description" content="$description">
+<style>
+body{margin:0;font:16px/1.5 system-ui,-apple-system,sans-serif;background:#f5f5f7;color:#1d1d1f}
+main{max-width:28rem;margin:0 auto;padding:2rem 1rem}
+.avatar{width:96px;height:96px;border-radius:50%;object-fit:cover;display:block;margin:0 auto}
+h1{font-size:1.5rem;margin:.75rem 0 0;text-align:center}
+.role{color:#6e6e73;text-align:center;margin:0}
+.bio{text-align:center}
+ul{list-style:none;padding:0;margin:1.5rem 0 0}
+li{margin:.5rem 0}
+li a,li span{display:block;padding:.75rem 1rem;background:#fff;border-radius:.75rem;color:inherit;text-decoration:none;overflow-wrap:anywhere}
+small{display:block;color:#6e6e73;font-size:.75rem}
+body.dark{background:#1d1d1f;color:#f5f5f7}
+body.dark li a,body.dark li span{background:#2c2c2e}
+</style>
+</head>
+<body class="$theme">
+<main>
+$avatar<h1>$name</h1>
+$role$bio<ul>
+$items</ul>
+</main>
+</body>
+</html>
+""")
+
+
+class PageVariants(NamedTuple):
+    etag: str
+    bodies: Dict[str, bytes]
+
+
+def _text(value: Optional[str]) -> str:
+    return html.escape(value or "")
+
+
+def _link_item(label: Optional[str], href: str, text: str) -> str:
+    return f'<li><a href="{html.escape(href)}" rel="noopener"><small>{_text(label)}</small>{_text(text)}</a></li>\n'
+
+
+def _text_item(label: Optional[str], text: str) -> str:
+    return f'<li><span><small>{_text(label)}</small>{_text(text)}</span></li>\n'
+
+
+def _items(profile: ProfileResponse) -> str:
+    items = []
+    shown = profile.settings
+    contact = profile.contactInfo
+    if contact:
+        if contact.email and shown and shown.showEmail:
+            items.append(_link_item("Email", f"mailto:{contact.email}", contact.email))
+        if contact.phone and shown and shown.showPhone:
+            items.append(_link_item("Phone", f"tel:{contact.phone}", contact.phone))
+        if contact.address:
+            items.append(_text_item("Address", contact.address))
+    if profile.website and profile.website.lower().startswith(LINK_SCHEMES):
+        items.append(_link_item("Website", profile.website, profile.website))
+    if profile.socialLinks:
+        for field, label in SOCIAL_LABELS.items():
+            url = getattr(profile.socialLinks, field)
+            if url and url != profile.website and url.lower().startswith(LINK_SCHEMES):
+                items.append(_link_item(label, url, url))
+    for custom in profile.customFields or []:
+        if not custom.value:
+            continue
+        if custom.type == "link" and custom.value.lower().startswith(LINK_SCHEMES):
+            items.append(_link_item(custom.label, custom.value, custom.value))
+        elif custom.type == "email":
+            items.append(_link_item(custom.label, f"mailto:{custom.value}", custom.value))
+        elif custom.type == "phone":
+            items.append(_link_item(custom.label, f"tel:{custom.value}", custom.value))
+        else:
+            items.append(_text_item(custom.label, custom.value))
+    return "".join(items)
+
+
+def render_profile_page(profile: ProfileResponse) -> str:
+    role = " at ".join(v for v in (profile.jobTitle, profile.company) if v)
+    avatar = ""
+    src = (profile.avatarVariants or {}).get("256") or profile.avatar
+    if src and (src.lower().startswith(LINK_SCHEMES) or storage.key_for_url(src)):
+        avatar = f'<img class="avatar" src="{html.escape(src)}" alt="" width="96" height="96">\n'
+    return PAGE.substitute(
+        title=_text(profile.displayName),
+        description=_text(profile.bio or role),
+        theme=_text(profile.theme),
+        avatar=avatar,
+        name=_text(profile.displayName),
+        role=f'<p class="role">{_text(role)}</p>\n' if role else "",
+        bio=f'<p class="bio">{_text(profile.bio)}</p>\n' if profile.bio else "",
+        items=_items(profile),
+    )
+
+
+class ProfilePageCache:
+    """Rendered and pre-compressed pages, one entry per profile version."""
+
+    def __init__(self, max_items: int):
+        self.pages = TTLCache(max_items, float("inf"))
+
+    def get(self, entry: CachedProfile) -> PageVariants:
+        # The profile ETag changes on every write, so a cached page is never stale
+        page = self.pages.get(entry.etag)
+        if page is None:
+            body = render_profile_page(entry.response).encode("utf-8")
+            page = PageVariants(entry.etag, compressed_variants(body))
+            self.pages.set(entry.etag, page)
+        return page
+
+
+profile_page_cache = ProfilePageCache(settings.PROFILE_PAGE_CACHE_SIZE)
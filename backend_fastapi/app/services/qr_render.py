@@ -0,0 +1,297 @@
+import asyncio
+import base64
+import hashlib
+import html
+import io
+import ipaddress
+import json
+import os
+import socket
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import qrcode
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from app.config import settings
+from app.models.qr import QR_MIN_SIZE, QR_MAX_SIZE, QR_MAX_MARGIN
+from app.services.workers import get_process_pool
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Only these settings change the rendered output
+RENDER_FIELDS = ("size", "foregroundColor", "backgroundColor", "errorCorrectionLevel", "margin")
+
+LOGO_SCALE = 0.22
+LOGO_MAX_PIXELS = 4096 * 4096
+
+LOGO_ALLOWED_HOSTS = {host.strip().lower() for host in settings.LOGO_ALLOWED_HOSTS.split(",") if host.strip()}
+
+
+def render_params(settings_in: dict) -> dict:
+    params = {k: settings_in.get(k) for k in RENDER_FIELDS}
+    # Documents saved before the input bounds existed must not render past them either
+    if params["size"] is not None:
+        params["size"] = min(max(int(params["size"]), QR_MIN_SIZE), QR_MAX_SIZE)
+    if params["margin"] is not None:
+        params["margin"] = min(max(int(params["margin"]), 0), QR_MAX_MARGIN)
+    return params
+
+
+def render_key(qr_data: str, params: dict, logo: Optional[str], fmt: str) -> str:
+    payload = json.dumps(
+        {"d": qr_data, "s": params, "l": logo, "f": fmt},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _build_matrix(qr_data: str, params: dict):
+    qr = qrcode.QRCode(
+        error_correction=ERROR_CORRECTION.get((params.get("errorCorrectionLevel") or "M").upper(), qrcode.constants.ERROR_CORRECT_M),
+        box_size=1,
+        border=max(0, int(params.get("margin") if params.get("margin") is not None else 4)),
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _render_png(matrix, params: dict, logo: Optional[bytes]) -> bytes:
+    size = int(params.get("size") or 200)
+    modules = len(matrix)
+    box = max(1, size // modules)
+    fg = params.get("foregroundColor") or "#000000"
+    bg = params.get("backgroundColor") or "#FFFFFF"
+
+    img = Image.new("RGB", (modules, modules), bg)
+    px = img.load()
+    fg_rgb = Image.new("RGB", (1, 1), fg).getpixel((0, 0))
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            if dark:
+                px[x, y] = fg_rgb
+    img = img.resize((modules * box, modules * box), Image.NEAREST)
+    if img.width != size:
+        img = img.resize((size, size), Image.NEAREST)
+
+    if logo:
+        mark = Image.open(io.BytesIO(logo)).convert("RGBA")
+        mark.thumbnail((int(size * LOGO_SCALE), int(size * LOGO_SCALE)), Image.LANCZOS)
+        pad = max(2, size // 100)
+        plate = Image.new("RGBA", (mark.width + 2 * pad, mark.height + 2 * pad), bg)
+        plate.paste(mark, (pad, pad), mark)
+        img.paste(plate, ((size - plate.width) // 2, (size - plate.height) // 2), plate)
+
+    out = io.BytesIO()
+    img.save(out, format="PNG", optimize=False)
+    return out.getvalue()
+
+
+def _render_svg(matrix, params: dict, logo: Optional[bytes]) -> bytes:
+    size = int(params.get("size") or 200)
+    modules = len(matrix)
+    fg = html.escape(params.get("foregroundColor") or "#000000")
+    bg = html.escape(params.get("backgroundColor") or "#FFFFFF")
+
+    path = []
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            if dark:
+                path.append(f"M{x} {y}h1v1h-1z")
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{size}" height="{size}" viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">',
+        f'<rect width="{modules}" height="{modules}" fill="{bg}"/>',
+        f'<path fill="{fg}" d="{"".join(path)}"/>',
+    ]
+    if logo:
+        mark = Image.open(io.BytesIO(logo))
+        buf = io.BytesIO()
+        mark.convert("RGBA").save(buf, format="PNG")
+        span = modules * LOGO_SCALE
+        offset = (modules - span) / 2
+        href = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+        parts.append(f'<rect x="{offset:.3f}" y="{offset:.3f}" width="{span:.3f}" height="{span:.3f}" fill="{bg}"/>')
+        parts.append(
+            f'<image x="{offset:.3f}" y="{offset:.3f}" width="{span:.3f}" height="{span:.3f}" '
+            f'preserveAspectRatio="xMidYMid meet" xlink:href="{href}"/>'
+        )
+    parts.append("</svg>")
+    return "".join(parts).encode("utf-8")
+
+
+def render_qr(qr_data: str, params: dict, fmt: str, logo: Optional[bytes] = None) -> bytes:
+    # Pure and picklable so it can run in a thread or a worker process.
+    # Raises ValueError for data past QR capacity or a color Pillow can't parse.
+    matrix = _build_matrix(qr_data, params)
+    if fmt == "svg":
+        return _render_svg(matrix, params, logo)
+    return _render_png(matrix, params, logo)
+
+
+class RenderCache:
+    """Bounded in-memory LRU of rendered images, backed by a directory on disk."""
+
+    def __init__(self, max_items: int, directory: Optional[str] = None):
+        self.max_items = max_items
+        self.directory = directory
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put_memory(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def read_disk(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_disk(self, key: str, data: bytes) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self.get_memory(key)
+        if data is None:
+            data = await run_in_threadpool(self.read_disk, key)
+            if data is not None:
+                self.put_memory(key, data)
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        self.put_memory(key, data)
+        await run_in_threadpool(self.write_disk, key, data)
+
+
+render_cache = RenderCache(settings.QR_RENDER_CACHE_SIZE, settings.QR_RENDER_CACHE_DIR)
+
+
+def decode_data_uri(uri: str) -> bytes:
+    if not uri.startswith("data:"):
+        raise ValueError("Not a data URI")
+    _, _, encoded = uri.partition(",")
+    return base64.b64decode(encoded)
+
+
+class LogoRefused(ValueError):
+    pass
+
+
+def _checked_logo(data: bytes) -> bytes:
+    # Reads the header only, so an oversized or bogus image is refused before anything decodes it
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError) as e:
+        raise LogoRefused(f"Unreadable logo: {e}")
+    if width * height > LOGO_MAX_PIXELS:
+        raise LogoRefused(f"Logo is {width}x{height}; at most {LOGO_MAX_PIXELS} pixels")
+    return data
+
+
+async def _check_logo_host(url: str) -> None:
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or host not in LOGO_ALLOWED_HOSTS:
+        raise LogoRefused(f"Logo host not allowed: {host or url[:100]}")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, ValueError) as e:
+        raise LogoRefused(f"Cannot resolve logo host {host}: {e}")
+    for info in infos:
+        if not ipaddress.ip_address(info[4][0]).is_global:
+            raise LogoRefused(f"Logo host {host} resolves to a non-public address")
+
+
+async def _fetch_logo(url: str) -> bytes:
+    await _check_logo_host(url)
+    limit = settings.LOGO_MAX_BYTES
+    # No redirects: their target would skip the host checks
+    async with httpx.AsyncClient(timeout=5.0, follow_redirects=False) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            declared = response.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > limit:
+                raise LogoRefused(f"Logo is larger than {limit} bytes")
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > limit:
+                    raise LogoRefused(f"Logo is larger than {limit} bytes")
+                chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def load_logo(logo: Optional[str]) -> Optional[bytes]:
+    """Logo bytes from a data: URI or an allow-listed public host; LogoRefused (a ValueError) otherwise."""
+    if not logo:
+        return None
+    if logo.startswith("data:"):
+        return _checked_logo(decode_data_uri(logo))
+    return _checked_logo(await _fetch_logo(logo))
+
+
+async def get_qr_image(qr, fmt: str) -> Tuple[str, bytes]:
+    params = render_params(qr.settings.dict())
+    key = render_key(qr.qrData, params, qr.logo, fmt)
+
+    data = await render_cache.get(key)
+    if data is not None:
+        return key, data
+
+    cacheable = True
+    try:
+        logo = await load_logo(qr.logo)
+    except (httpx.HTTPError, ValueError):
+        # Serve without the overlay, but don't pin that result under this key
+        logo, cacheable = None, False
+
+    # Pure-Python module drawing holds the GIL, so a thread would still stall the event loop
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(get_process_pool(), render_qr, qr.qrData, params, fmt, logo)
+    if cacheable:
+        await render_cache.put(key, data)
+    return key, data
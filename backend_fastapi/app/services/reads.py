@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Optional, Type
+
+from beanie import Document
+from bson import ObjectId
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+_MISSING = object()
+
+FIELDS_DESCRIPTION = "Comma-separated response fields to return; id is always included"
+
+
+class RowReader:
+    """Reads one collection straight into response-shaped dicts.
+
+    The query projects only the response model's fields, and rows skip
+    Document hydration: ``_id`` becomes ``id``, top-level ObjectIds become
+    strings, and fields absent from older documents take the Document's
+    defaults. Rows already have the response model's shape, so routes send
+    them with rows_response and skip validating them a second time.
+
+    A ``fields`` list narrows both the projection and the row to a sparse
+    fieldset; ``id`` is always included.
+    """
+
+    def __init__(self, document: Type[Document], response: Type[BaseModel]):
+        self.document = document
+        self.fields = [name for name in response.model_fields if name != "id"]
+        self.projection = {name: 1 for name in self.fields}
+        self.defaults: Dict[str, Any] = {}
+        for name in self.fields:
+            field = document.model_fields.get(name)
+            if field is not None and not field.is_required():
+                default = field.get_default(call_default_factory=True)
+                if isinstance(default, BaseModel):
+                    default = default.model_dump()
+                self.defaults[name] = default
+
+    def select(self, fields: Optional[str]) -> Optional[List[str]]:
+        """Parse a comma-separated ``?fields=`` value; None means every field."""
+        if fields is None:
+            return None
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in names if name != "id" and name not in self.projection]
+        if unknown or not names:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                       f"Available: id, {', '.join(self.fields)}"
+            )
+        return [name for name in names if name != "id"]
+
+    def projection_for(self, fields: Optional[List[str]]) -> dict:
+        if fields is None:
+            return self.projection
+        # An empty projection would return whole documents
+        return {name: 1 for name in fields} or {"_id": 1}
+
+    def row(self, doc: dict, fields: Optional[List[str]] = None) -> dict:
+        out = {"id": str(doc["_id"])}
+        for name in self.fields if fields is None else fields:
+            value = doc.get(name, _MISSING)
+            if value is _MISSING:
+                value = self.defaults.get(name)
+            elif isinstance(value, ObjectId):
+                value = str(value)
+            out[name] = value
+        return out
+
+    async def find_one(self, query: dict, fields: Optional[List[str]] = None, also: tuple = ()) -> Optional[dict]:
+        """The projected document as stored; ``also`` reads fields the route needs for itself."""
+        projection = dict(self.projection_for(fields), **{name: 1 for name in also})
+        return await self.document.get_motor_collection().find_one(query, projection)
+
+    async def find(
+        self,
+        query: dict,
+        sort: Optional[list] = None,
+        skip: int = 0,
+        limit: int = 0,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        cursor = self.document.get_motor_collection().find(
+            query, self.projection_for(fields), skip=skip, limit=limit
+        )
+        if sort:
+            cursor = cursor.sort(sort)
+        return [self.row(doc, fields) async for doc in cursor]
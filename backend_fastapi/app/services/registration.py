@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import List
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app import database
+from app.auth.security import hash_password_async
+from app.config import settings
+from app.models.profile import Profile
+from app.models.qr import QRCode
+from app.models.user import User
+from app.services.usernames import username_allocator
+
+logger = logging.getLogger(__name__)
+
+
+class EmailTaken(Exception):
+    pass
+
+
+def _is_username_conflict(error: DuplicateKeyError) -> bool:
+    return "username" in ((error.details or {}).get("keyPattern") or {})
+
+
+async def _insert_user(user: User, session=None) -> None:
+    try:
+        await user.insert(session=session)
+    except DuplicateKeyError as e:
+        if _is_username_conflict(e):
+            raise
+        raise EmailTaken() from e
+
+
+async def _insert_in_transaction(user: User, profile: Profile, qr_code: QRCode) -> None:
+    async with await database.client.start_session() as session:
+        async def write(session):
+            # Statements in one session run one at a time
+            await _insert_user(user, session)
+            await profile.insert(session=session)
+            await qr_code.insert(session=session)
+
+        await session.with_transaction(write)
+
+
+async def _insert_with_cleanup(user: User, profile: Profile, qr_code: QRCode) -> None:
+    # The email check has to land first; the dependents can then go out together
+    await _insert_user(user)
+    results = await asyncio.gather(profile.insert(), qr_code.insert(), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        # No transaction to roll back: undo whatever did land
+        await asyncio.gather(
+            QRCode.get_motor_collection().delete_one({"_id": qr_code.id}),
+            Profile.get_motor_collection().delete_one({"_id": profile.id}),
+            User.get_motor_collection().delete_one({"_id": user.id}),
+            return_exceptions=True,
+        )
+        raise errors[0]
+
+
+async def register_user(name: str, email: str, password: str) -> User:
+    """Create a user with its default profile and QR code, all or nothing.
+
+    Raises EmailTaken if the email is already registered.
+    """
+    # bcrypt runs in its pool while the username is being picked
+    hashed_password, username = await asyncio.gather(
+        hash_password_async(password),
+        username_allocator.allocate(name),
+    )
+    user = User(id=PydanticObjectId(), name=name, email=email, password=hashed_password)
+    tried: List[str] = []
+    while True:
+        profile = Profile(id=PydanticObjectId(), user=user.id, displayName=name, username=username)
+        qr_code = QRCode(
+            user=user.id,
+            profile=profile.id,
+            name=f"{name} QR Code",
+            type="profile",
+            qrData=f"{settings.FRONTEND_URL}/p/{username}",
+            isActive=True,
+        )
+        try:
+            if database.transactions_supported:
+                await _insert_in_transaction(user, profile, qr_code)
+            else:
+                await _insert_with_cleanup(user, profile, qr_code)
+            break
+        except DuplicateKeyError as e:
+            # Lost a race for the username; the unique index is the final word
+            if not _is_username_conflict(e):
+                raise
+            username_allocator.add(username)
+            tried.append(username)
+            username = await username_allocator.allocate(name, exclude=tried)
+    username_allocator.add(username)
+    return user
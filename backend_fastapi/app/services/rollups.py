@@ -0,0 +1,73 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Tuple, Type
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models.analytics import AnalyticsRollup, DailyAnalyticsRollup, HourlyAnalyticsRollup
+
+logger = logging.getLogger(__name__)
+
+
+def hour_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(at: datetime) -> datetime:
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+GRANULARITIES: Dict[str, Tuple[Type[AnalyticsRollup], object]] = {
+    "hour": (HourlyAnalyticsRollup, hour_bucket),
+    "day": (DailyAnalyticsRollup, day_bucket),
+}
+
+
+class RollupWriter:
+    """Accumulates event counts per rollup key and applies them as $inc upserts."""
+
+    def __init__(self):
+        self._pending: Dict[str, Counter] = {name: Counter() for name in GRANULARITIES}
+
+    def __len__(self) -> int:
+        # Rollup keys still waiting to be written
+        return sum(len(batch) for batch in self._pending.values())
+
+    def add(self, events: Iterable[dict]) -> None:
+        for event in events:
+            at = event.get("created_at") or datetime.utcnow()
+            for name, (_, bucket) in GRANULARITIES.items():
+                key = (event.get("profile"), event.get("qrCode"), event.get("eventType"), bucket(at))
+                self._pending[name][key] += 1
+
+    async def flush(self) -> None:
+        for name, (model, _) in GRANULARITIES.items():
+            batch = self._pending[name]
+            if not batch:
+                continue
+            self._pending[name] = Counter()
+            operations = [
+                UpdateOne(
+                    {"profile": profile, "bucket": bucket, "eventType": event_type, "qrCode": qr_code},
+                    {"$inc": {"total": count}},
+                    upsert=True,
+                )
+                for (profile, qr_code, event_type, bucket), count in batch.items()
+            ]
+            try:
+                await model.get_motor_collection().bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # The rest of the unordered batch was applied; keep only the rejected counts
+                keys = list(batch)
+                failed = [keys[err["index"]] for err in e.details.get("writeErrors", [])]
+                logger.error("%d of %d %s rollups failed; retrying them next flush", len(failed), len(keys), name)
+                self._pending[name].update({key: batch[key] for key in failed})
+            except Exception:
+                # Nothing known to have landed; may double-count if the server applied it before the error
+                logger.exception("Failed to apply %d %s rollups", len(operations), name)
+                self._pending[name].update(batch)
+
+
+rollup_writer = RollupWriter()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.models.qr import QRCode
+from app.models.scan import ScanBucket
+from app.services.unique_counts import unique_counter, visitor_id
+
+logger = logging.getLogger(__name__)
+
+BUCKET_FIELDS = ("offsets", "ipAddress", "userAgent", "device", "location")
+
+
+def bucket_start(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def _failed_keys(batch: Dict, error: BulkWriteError) -> Dict:
+    # Operations are built from batch in iteration order, so an error's index is a position in it
+    keys = list(batch)
+    return {keys[err["index"]]: batch[keys[err["index"]]] for err in error.details.get("writeErrors", [])}
+
+
+class _Pending:
+    __slots__ = ("count", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.last: Optional[datetime] = None
+
+    def add(self, count: int, at: datetime) -> None:
+        self.count += count
+        if self.last is None or at > self.last:
+            self.last = at
+
+
+class _PendingBucket:
+    __slots__ = ("total", "events")
+
+    def __init__(self):
+        self.total = 0
+        self.events: Dict[str, List] = {field: [] for field in BUCKET_FIELDS}
+
+    def merge(self, other: "_PendingBucket", max_events: int) -> None:
+        self.total += other.total
+        room = max_events - len(self.events["offsets"])
+        for field in BUCKET_FIELDS:
+            self.events[field].extend(other.events[field][:room])
+
+
+class ScanCounter:
+    """Coalesces scans per QR id and writes them as one periodic bulk update."""
+
+    def __init__(self, interval: float, max_keys: int, max_bucket_events: int):
+        self.interval = interval
+        self.max_keys = max_keys
+        self.max_bucket_events = max_bucket_events
+        self._pending: Dict = {}
+        self._buckets: Dict[Tuple, _PendingBucket] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        qr_id,
+        at: Optional[datetime] = None,
+        ipAddress: Optional[str] = None,
+        userAgent: Optional[str] = None,
+        device: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> None:
+        at = at or datetime.utcnow()
+        pending = self._pending.get(qr_id)
+        if pending is None:
+            pending = self._pending[qr_id] = _Pending()
+        pending.add(1, at)
+        unique_counter.add("qr", qr_id, visitor_id(None, ipAddress, userAgent), at)
+
+        start = bucket_start(at)
+        bucket = self._buckets.get((qr_id, start))
+        if bucket is None:
+            bucket = self._buckets[(qr_id, start)] = _PendingBucket()
+        bucket.total += 1
+        if len(bucket.events["offsets"]) < self.max_bucket_events:
+            events = bucket.events
+            events["offsets"].append(int((at - start).total_seconds()))
+            events["ipAddress"].append(ipAddress)
+            events["userAgent"].append(userAgent)
+            events["device"].append(device)
+            events["location"].append(location)
+
+        if len(self._pending) >= self.max_keys or len(self._buckets) >= self.max_keys:
+            self._wakeup.set()
+
+    def _count_operations(self, batch: Dict) -> list:
+        return [
+            UpdateOne(
+                {"_id": qr_id},
+                {
+                    "$inc": {"scanCount": p.count, "analytics.totalScans": p.count},
+                    "$max": {"analytics.lastScannedAt": p.last},
+                },
+            )
+            for qr_id, p in batch.items()
+        ]
+
+    def _bucket_operations(self, batch: Dict) -> list:
+        return [
+            UpdateOne(
+                {"qrCode": qr_id, "bucket": start},
+                {
+                    "$inc": {"total": b.total},
+                    "$push": {
+                        field: {"$each": b.events[field], "$slice": self.max_bucket_events}
+                        for field in BUCKET_FIELDS
+                    },
+                    "$setOnInsert": {"created_at": datetime.utcnow()},
+                },
+                upsert=True,
+            )
+            for (qr_id, start), b in batch.items()
+        ]
+
+    async def _flush_counts(self) -> None:
+        batch, self._pending = self._pending, {}
+        try:
+            await QRCode.get_motor_collection().bulk_write(self._count_operations(batch), ordered=False)
+        except BulkWriteError as e:
+            # The rest of the unordered batch was applied; only the rejected updates go round again
+            failed = _failed_keys(batch, e)
+            logger.error("Scan counter flush: %d of %d updates failed; retrying them next cycle", len(failed), len(batch))
+            self._requeue_counts(failed)
+        except Exception:
+            logger.exception("Scan counter flush failed; retrying %d ids next cycle", len(batch))
+            self._requeue_counts(batch)
+
+    def _requeue_counts(self, batch: Dict) -> None:
+        for qr_id, p in batch.items():
+            pending = self._pending.get(qr_id)
+            if pending is None:
+                self._pending[qr_id] = p
+            else:
+                pending.add(p.count, p.last)
+
+    async def _flush_buckets(self) -> None:
+        batch, self._buckets = self._buckets, {}
+        try:
+            await ScanBucket.get_motor_collection().bulk_write(self._bucket_operations(batch), ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_keys(batch, e)
+            logger.error("Scan bucket flush: %d of %d upserts failed; retrying them next cycle", len(failed), len(batch))
+            self._requeue_buckets(failed)
+        except Exception:
+            logger.exception("Scan bucket flush failed; retrying %d buckets next cycle", len(batch))
+            self._requeue_buckets(batch)
+
+    def _requeue_buckets(self, batch: Dict) -> None:
+        for key, b in batch.items():
+            pending = self._buckets.get(key)
+            if pending is None:
+                self._buckets[key] = b
+            else:
+                pending.merge(b, self.max_bucket_events)
+
+    async def flush(self) -> None:
+        # Counters and history are retried independently, and after a partial bulk
+        # write only the rejected operations are, so neither re-applies what landed.
+        # Any other error re-queues the whole batch: the driver has already retried
+        # a dropped connection once, and if that also failed the server may still
+        # have applied some writes, which then count twice (at-least-once).
+        if self._pending:
+            await self._flush_counts()
+        if self._buckets:
+            await self._flush_buckets()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+scan_counter = ScanCounter(
+    settings.SCAN_FLUSH_INTERVAL_SECONDS,
+    settings.SCAN_FLUSH_MAX_KEYS,
+    settings.SCAN_BUCKET_MAX_EVENTS,
+)
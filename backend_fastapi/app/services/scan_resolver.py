@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Set
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.config import settings
+from app.database import public_collection
+from app.models.qr import QRCode
+from app.services.cache import TTLCache
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Unknown ids are remembered briefly so a bad printed code can't hammer Mongo
+NEGATIVE_TTL_SECONDS = 5
+
+_PROJECTION = {"qrData": 1, "isActive": 1, "settings.expiresAt": 1}
+
+
+class ScanTarget(NamedTuple):
+    qrData: str
+    isActive: bool
+    expiresAt: Optional[datetime] = None
+
+
+def encode_short_id(qr_id: ObjectId) -> str:
+    number = int.from_bytes(ObjectId(str(qr_id)).binary, "big")
+    chars = []
+    while number:
+        number, rem = divmod(number, 62)
+        chars.append(BASE62[rem])
+    return "".join(reversed(chars)) or "0"
+
+
+def decode_short_id(short_id: str) -> Optional[PydanticObjectId]:
+    if len(short_id) == 24:
+        try:
+            return PydanticObjectId(short_id)
+        except (InvalidId, TypeError):
+            pass
+    number = 0
+    for char in short_id:
+        index = BASE62.find(char)
+        if index < 0:
+            return None
+        number = number * 62 + index
+    if number >= 1 << 96:
+        return None
+    return PydanticObjectId(number.to_bytes(12, "big"))
+
+
+class ScanResolver:
+    def __init__(self, max_items: int, ttl: float):
+        self.cache = TTLCache(max_items, ttl)
+        self._inflight: Dict[PydanticObjectId, asyncio.Future] = {}
+        self._invalidated: Set[PydanticObjectId] = set()
+
+    async def _fetch(self, qr_id: PydanticObjectId) -> Optional[ScanTarget]:
+        self._invalidated.discard(qr_id)
+        doc = await public_collection(QRCode).find_one({"_id": qr_id}, _PROJECTION)
+        target = None
+        if doc is not None:
+            target = ScanTarget(
+                qrData=doc.get("qrData", ""),
+                isActive=doc.get("isActive", True),
+                expiresAt=(doc.get("settings") or {}).get("expiresAt"),
+            )
+        if qr_id in self._invalidated:
+            # Written while we were reading: don't pin what may be the old value
+            self._invalidated.discard(qr_id)
+        else:
+            self.cache.set(qr_id, target, None if target else NEGATIVE_TTL_SECONDS)
+        return target
+
+    def _load(self, qr_id: PydanticObjectId) -> asyncio.Future:
+        # Single-flight: concurrent misses for one id share a single query
+        future = self._inflight.get(qr_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(qr_id))
+            self._inflight[qr_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(qr_id, None))
+        return future
+
+    async def resolve(self, qr_id: PydanticObjectId) -> Optional[ScanTarget]:
+        entry = self.cache.get_entry(qr_id)
+        if entry is not None:
+            target, fresh = entry
+            if not fresh:
+                # Serve the stale target now; refresh in the background
+                self._load(qr_id).add_done_callback(lambda f: f.cancelled() or f.exception())
+            return target
+        return await asyncio.shield(self._load(qr_id))
+
+    def invalidate(self, qr_id: PydanticObjectId) -> None:
+        self.cache.pop(qr_id)
+        if qr_id in self._inflight:
+            self._invalidated.add(qr_id)
+
+
+scan_resolver = ScanResolver(settings.SCAN_CACHE_SIZE, settings.SCAN_CACHE_TTL_SECONDS)
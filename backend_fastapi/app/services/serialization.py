@@ -0,0 +1,33 @@
+from typing import Any, Dict, List, Optional, Union
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson, which emits the same ISO datetimes as pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def model_response(
+    content: BaseModel,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Send a response model the handler already built without FastAPI validating it again."""
+    return Response(content.model_dump_json(), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def rows_response(rows: Union[dict, List[dict]], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Send a RowReader row, or a list of them, as-is: rows already have the response model's shape."""
+    return FastJSONResponse(rows, headers=headers)
@@ -0,0 +1,81 @@
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.config import settings
+
+# Keys are generated by us; anything else (.., absolute paths, odd characters) is refused
+KEY_PATTERN = re.compile(r"^[a-z0-9]+(?:/[a-z0-9]+)*\.[a-z0-9]+$")
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(KEY_PATTERN.match(key))
+
+
+class StorageBackend(ABC):
+    """Write-once blob storage addressed by key; keys never change meaning."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def key_for_url(self, url: Optional[str]) -> Optional[str]:
+        prefix = self.base_url + "/"
+        if url and url.startswith(prefix) and is_valid_key(url[len(prefix):]):
+            return url[len(prefix):]
+        return None
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def read(self, key: str) -> bytes: ...
+
+    @abstractmethod
+    def write(self, key: str, data: bytes) -> None: ...
+
+
+class LocalFileStorage(StorageBackend):
+    """Stores blobs under a directory on local disk. Methods block; call them off the loop."""
+
+    def __init__(self, root: str, base_url: str):
+        super().__init__(base_url)
+        self.root = root
+
+    def path(self, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write aside and rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def scratch_dir(self) -> str:
+        directory = os.path.join(self.root, ".uploads")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+storage = LocalFileStorage(settings.MEDIA_ROOT, settings.MEDIA_BASE_URL)
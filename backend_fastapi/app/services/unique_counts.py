@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from bson import Binary
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.models.analytics import UniqueSketch
+from app.models.qr import QRCode
+from app.services.hll import HyperLogLog, hash64
+from app.services.rollups import day_bucket
+
+logger = logging.getLogger(__name__)
+
+MERGE_ATTEMPTS = 5
+MERGE_CONCURRENCY = 16
+
+SketchKey = Tuple[str, object, Optional[datetime]]
+
+
+def visitor_id(session_id: Optional[str], ip: Optional[str], user_agent: Optional[str] = None) -> Optional[str]:
+    if session_id:
+        return f"s:{session_id}"
+    if ip:
+        return f"i:{ip}|{user_agent or ''}"
+    return None
+
+
+class UniqueCounter:
+    """Collects visitor hashes in memory and merges them into stored HyperLogLog sketches.
+
+    Each (scope, key) gets an all-time sketch and one per day. Mongo can't take a
+    register-wise max, so every stored sketch is merged read-modify-write, guarded
+    by a version check and retried on conflict.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Dict[SketchKey, Set[int]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, scope: str, key, visitor: Optional[str], at: Optional[datetime] = None) -> None:
+        if key is None or visitor is None:
+            return
+        h = hash64(visitor)
+        self._pending[(scope, key, None)].add(h)
+        self._pending[(scope, key, day_bucket(at or datetime.utcnow()))].add(h)
+
+    def add_events(self, events: Iterable[dict]) -> None:
+        for event in events:
+            metadata = event.get("metadata") or {}
+            visitor = visitor_id(metadata.get("sessionId"), metadata.get("ipAddress"), metadata.get("userAgent"))
+            self.add("profile", event.get("profile"), visitor, event.get("created_at"))
+
+    async def _merge(self, key: SketchKey, hashes: Set[int]) -> Optional[HyperLogLog]:
+        scope, ref, bucket = key
+        collection = UniqueSketch.get_motor_collection()
+        selector = {"scope": scope, "key": ref, "bucket": bucket}
+        for _ in range(MERGE_ATTEMPTS):
+            doc = await collection.find_one(selector, {"registers": 1, "version": 1})
+            if doc is None:
+                sketch = HyperLogLog().update(hashes)
+                try:
+                    await collection.insert_one({
+                        **selector,
+                        "registers": Binary(sketch.to_bytes()),
+                        "version": 1,
+                        "updated_at": datetime.utcnow(),
+                    })
+                    return sketch
+                except DuplicateKeyError:
+                    continue
+            sketch = HyperLogLog.from_bytes(doc["registers"]).update(hashes)
+            result = await collection.update_one(
+                {"_id": doc["_id"], "version": doc["version"]},
+                {
+                    "$set": {"registers": Binary(sketch.to_bytes()), "updated_at": datetime.utcnow()},
+                    "$inc": {"version": 1},
+                },
+            )
+            if result.modified_count:
+                return sketch
+        # Re-adding is harmless: merging the same hashes twice leaves the registers unchanged
+        logger.warning("Gave up merging sketch %s after %d conflicts; retrying next cycle", key, MERGE_ATTEMPTS)
+        self._pending[key] |= hashes
+        return None
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, defaultdict(set)
+        limit = asyncio.Semaphore(MERGE_CONCURRENCY)
+
+        async def merge(key, hashes):
+            async with limit:
+                try:
+                    return key, await self._merge(key, hashes)
+                except Exception:
+                    logger.exception("Failed to merge sketch %s; retrying next cycle", key)
+                    self._pending[key] |= hashes
+                    return key, None
+
+        merged = await asyncio.gather(*(merge(k, h) for k, h in batch.items()))
+
+        # Keep the denormalised QRCode.analytics.uniqueScans in step with the all-time sketch
+        updates = [
+            UpdateOne({"_id": ref}, {"$max": {"analytics.uniqueScans": sketch.count()}})
+            for (scope, ref, bucket), sketch in merged
+            if sketch is not None and scope == "qr" and bucket is None
+        ]
+        if updates:
+            await QRCode.get_motor_collection().bulk_write(updates, ordered=False)
+
+    async def estimate(self, scope: str, key, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        # All-time when no range is given, otherwise the union of the daily sketches
+        if start is None and end is None:
+            selector = {"scope": scope, "key": key, "bucket": None}
+        else:
+            selector = {"scope": scope, "key": key, "bucket": {"$gte": day_bucket(start or datetime.min), "$lte": end or datetime.utcnow()}}
+        union = HyperLogLog()
+        async for doc in UniqueSketch.get_motor_collection().find(selector, {"registers": 1}):
+            union.merge(HyperLogLog.from_bytes(doc["registers"]))
+        return union.count()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Unique count flush failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+unique_counter = UniqueCounter(settings.SKETCH_FLUSH_INTERVAL_SECONDS)
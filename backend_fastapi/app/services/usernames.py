@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import re
+from typing import Iterable, List, Optional
+
+from app.config import settings
+from app.models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{3,30}$")
+CANDIDATES_PER_ROUND = 8
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; ``in`` can return false positives but never false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+def username_base(name: str) -> str:
+    base = re.sub(r"[^a-z0-9]", "", (name or "").lower())[:20]
+    return base or "user"
+
+
+def is_valid_username(username: str) -> bool:
+    return bool(USERNAME_PATTERN.match(username or ""))
+
+
+class UsernameAllocator:
+    """Picks free usernames, answering most lookups from an in-memory Bloom filter.
+
+    The filter is a hint only: a negative means no profile had the name when the
+    filter was built or since this process wrote it. The unique index on
+    Profile.username stays the source of truth, and callers retry on a duplicate key.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def rebuild(self) -> None:
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        cursor = Profile.get_motor_collection().find(
+            {"username": {"$type": "string"}}, {"_id": 0, "username": 1}
+        ).batch_size(10000)
+        count = 0
+        async for doc in cursor:
+            bloom.add(doc["username"])
+            count += 1
+            if count % 10000 == 0:
+                await asyncio.sleep(0)
+        self.bloom = bloom
+        self.ready = True
+        logger.info("Username filter built from %d profiles", count)
+
+    def start(self) -> None:
+        # Until the filter is built, availability checks fall through to Mongo
+        if self._task is None:
+            self._task = asyncio.create_task(self.rebuild())
+            self._task.add_done_callback(self._rebuilt)
+
+    @staticmethod
+    def _rebuilt(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            # ready stays False, so lookups keep going to Mongo
+            logger.error("Username filter build failed", exc_info=task.exception())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass  # already logged by _rebuilt
+            self._task = None
+
+    def add(self, username: Optional[str]) -> None:
+        if username:
+            self.bloom.add(username)
+
+    def maybe_taken(self, username: str) -> bool:
+        return not self.ready or username in self.bloom
+
+    async def _taken(self, usernames: List[str]) -> set:
+        cursor = Profile.get_motor_collection().find(
+            {"username": {"$in": usernames}}, {"_id": 0, "username": 1}
+        )
+        return {doc["username"] async for doc in cursor}
+
+    async def is_available(self, username: str) -> bool:
+        if not self.maybe_taken(username):
+            return True
+        return not await self._taken([username])
+
+    async def allocate(self, name: str, exclude: Iterable[str] = ()) -> str:
+        base = username_base(name)
+        excluded = set(exclude)
+        digits = 4
+        while True:
+            low, high = 10 ** (digits - 1), 10 ** digits - 1
+            candidates = list({f"{base}{random.randint(low, high)}" for _ in range(CANDIDATES_PER_ROUND)} - excluded)
+            for candidate in candidates:
+                if not self.maybe_taken(candidate):
+                    return candidate
+            # Every candidate might be taken: settle it with one $in query
+            taken = await self._taken(candidates)
+            for candidate in candidates:
+                if candidate not in taken:
+                    return candidate
+            digits += 1
+
+
+username_allocator = UsernameAllocator(settings.USERNAME_BLOOM_CAPACITY, settings.USERNAME_BLOOM_ERROR_RATE)
@@ -0,0 +1,173 @@
+import base64
+import hashlib
+import io
+import logging
+import re
+from typing import NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+
+from app.config import settings
+from app.schemas.profile import ProfileResponse, VCardVersion
+from app.services.cache import TTLCache
+from app.services.profile_cache import CachedProfile
+from app.services.profile_page import LINK_SCHEMES, SOCIAL_LABELS
+from app.services.qr_render import decode_data_uri
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+PHOTO_SIZE = 256
+
+# Characters a tel: URI may carry (RFC 3966 digits and visual separators)
+_TEL_URI_UNSAFE = re.compile(r"[^0-9+*#().\-]")
+_FILENAME_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+# Avatars that fail to load are retried after this long rather than per version
+PHOTO_RETRY_SECONDS = 60
+
+
+class CachedVCard(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\r\n", "\n")
+        .replace("\r", "\n")
+        .replace("\n", "\\n")
+        .replace(",", "\\,")
+        .replace(";", "\\;")
+    )
+
+
+def _fold(line: str) -> str:
+    # Lines longer than 75 octets continue on the next line after a space
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts)
+
+
+def downscale_avatar(data: bytes) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((PHOTO_SIZE, PHOTO_SIZE))
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=80, optimize=True)
+        return out.getvalue()
+
+
+def build_vcard(profile: ProfileResponse, version: VCardVersion, photo: Optional[bytes] = None) -> str:
+    v4 = version == VCardVersion.v4
+    lines = ["BEGIN:VCARD", f"VERSION:{version.value}"]
+    name = _escape(profile.displayName)
+    lines.append(f"FN:{name}")
+    lines.append(f"N:;{name};;;")
+    if profile.company:
+        lines.append(f"ORG:{_escape(profile.company)}")
+    if profile.jobTitle:
+        lines.append(f"TITLE:{_escape(profile.jobTitle)}")
+
+    shown = profile.settings
+    contact = profile.contactInfo
+    if contact:
+        if contact.email and shown and shown.showEmail:
+            lines.append(f"EMAIL;TYPE={'work' if v4 else 'INTERNET'}:{_escape(contact.email)}")
+        if contact.phone and shown and shown.showPhone:
+            if v4:
+                # A URI value can't be escaped, so anything else (CR/LF included) is dropped
+                tel = _TEL_URI_UNSAFE.sub("", contact.phone)
+                if tel:
+                    lines.append(f"TEL;VALUE=uri;TYPE=cell:tel:{tel}")
+            else:
+                lines.append(f"TEL;TYPE=CELL:{_escape(contact.phone)}")
+        if contact.address:
+            lines.append(f"ADR;TYPE={'work' if v4 else 'WORK'}:;;{_escape(contact.address)};;;;")
+
+    urls = []
+    if profile.website and profile.website.lower().startswith(LINK_SCHEMES):
+        urls.append(profile.website)
+    for url in urls:
+        lines.append(f"URL:{_escape(url)}")
+    if profile.socialLinks:
+        for field, label in SOCIAL_LABELS.items():
+            url = getattr(profile.socialLinks, field)
+            if url and url not in urls and url.lower().startswith(LINK_SCHEMES):
+                lines.append(f"X-SOCIALPROFILE;TYPE={field}:{_escape(url)}")
+    if profile.bio:
+        lines.append(f"NOTE:{_escape(profile.bio)}")
+
+    if photo:
+        encoded = base64.b64encode(photo).decode("ascii")
+        if v4:
+            lines.append(f"PHOTO:data:image/jpeg;base64,{encoded}")
+        else:
+            lines.append(f"PHOTO;ENCODING=b;TYPE=JPEG:{encoded}")
+    lines.append("END:VCARD")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def vcard_filename(profile: ProfileResponse) -> str:
+    # Goes inside a quoted Content-Disposition filename, so keep it to plain ASCII
+    base = _FILENAME_UNSAFE.sub("-", profile.username or "").strip("-.")
+    return f"{base or profile.id}.vcf"
+
+
+class VCardCache:
+    """Finished vCards per profile version, plus the downscaled avatars they embed."""
+
+    def __init__(self, max_items: int):
+        self.cards = TTLCache(max_items, float("inf"))
+        self.photos = TTLCache(max_items, float("inf"))
+
+    async def _load(self, avatar: str) -> bytes:
+        stored = storage.key_for_url(avatar)
+        if stored:
+            return await run_in_threadpool(storage.read, stored)
+        return decode_data_uri(avatar)
+
+    async def photo(self, profile: ProfileResponse) -> Optional[bytes]:
+        avatar = (profile.avatarVariants or {}).get("256") or profile.avatar
+        if not avatar:
+            return None
+        # Never fetch a remote avatar: these routes are public, and the URL is
+        # whatever the profile owner typed
+        if not (avatar.lower().startswith("data:") or storage.key_for_url(avatar)):
+            return None
+        # Avatars may be data URIs, so key by digest rather than the string itself
+        key = hashlib.sha256(avatar.encode("utf-8")).digest()
+        entry = self.photos.get_entry(key)
+        if entry is not None and entry[1]:
+            return entry[0]
+        try:
+            photo = await run_in_threadpool(downscale_avatar, await self._load(avatar))
+            self.photos.set(key, photo)
+        except (ValueError, OSError, Image.DecompressionBombError) as e:
+            logger.warning("Could not load avatar %s for vCard: %s", avatar[:100], e)
+            photo = None
+            self.photos.set(key, None, PHOTO_RETRY_SECONDS)
+        return photo
+
+    async def get(self, entry: CachedProfile, version: VCardVersion) -> CachedVCard:
+        # Keyed by the profile ETag, so an update makes the old card unreachable
+        key = (entry.etag, version)
+        card = self.cards.get(key)
+        if card is None:
+            photo = await self.photo(entry.response)
+            body = build_vcard(entry.response, version, photo).encode("utf-8")
+            card = CachedVCard(f'{entry.etag[:-1]}-vcf{version.value[0]}"', body)
+            self.cards.set(key, card)
+        return card
+
+
+vcard_cache = VCardCache(settings.VCARD_CACHE_SIZE)
@@ -0,0 +1,85 @@
+import hashlib
+from datetime import datetime
+from typing import List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+
+
+def version_etag(doc_id, version: int) -> str:
+    return f'"{doc_id}-v{version}"'
+
+
+def fieldset_etag(etag: str, fields: Optional[List[str]]) -> str:
+    """The ETag for a sparse fieldset of the representation ``etag`` names."""
+    if fields is None:
+        return etag
+    digest = hashlib.blake2b(",".join(sorted(fields)).encode("utf-8"), digest_size=4).hexdigest()
+    return f'{etag[:-1]}-f{digest}"'
+
+
+def if_match_versions(header: Optional[str], doc_id) -> Optional[List[Optional[int]]]:
+    """Versions an If-Match header allows overwriting; None when it sets no precondition."""
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"{doc_id}-v'
+    versions: List[Optional[int]] = []
+    for tag in header.split(","):
+        # Compressed responses carry the weak form of the same tag; the version
+        # it names is still exact, so it is accepted as a precondition
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if not (tag.startswith(prefix) and tag.endswith('"')):
+            continue
+        # A sparse fieldset's tag names the same version
+        version = tag[len(prefix):-1].split("-f", 1)[0]
+        if version.isascii() and version.isdigit():  # isdigit alone accepts "²", which int() refuses
+            versions.append(int(version))
+    if 0 in versions:
+        versions.append(None)  # written before documents carried a version
+    return versions
+
+
+async def update_owned(
+    document: Type[Document],
+    doc_id: PydanticObjectId,
+    principal,
+    changes: dict,
+    projection: dict,
+    if_match: Optional[str] = None,
+    not_found: str = "Not found",
+    forbidden: str = "Not authorized",
+) -> dict:
+    """Apply $set in one find_one_and_update and return the document as written.
+
+    Ownership and the If-Match version are part of the filter, so there is no
+    read before the write and a concurrent edit can't be silently overwritten.
+    """
+    query = {"_id": doc_id}
+    if principal.role != "admin":
+        query["user"] = principal.id
+    versions = if_match_versions(if_match, doc_id)
+    if versions is not None:
+        query["version"] = {"$in": versions}
+
+    collection = document.get_motor_collection()
+    doc = await collection.find_one_and_update(
+        query,
+        {"$set": {**changes, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+        projection={**projection, "version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        # Only a failed write pays for a second read, to report why
+        existing = await collection.find_one({"_id": doc_id}, {"user": 1})
+        if existing is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        if principal.role != "admin" and existing.get("user") != principal.id:
+            raise HTTPException(status_code=403, detail=forbidden)
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Modified by someone else; fetch the latest version and retry"
+        )
+    return doc
@@ -0,0 +1,26 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.config import settings
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def worker_count() -> int:
+    return settings.RENDER_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    # Created lazily so workers are only forked once something CPU-bound needs them
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=worker_count())
+    return _process_pool
+
+
+def shutdown_workers() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
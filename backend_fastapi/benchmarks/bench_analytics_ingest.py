@@ -0,0 +1,69 @@
+"""Events/sec through /api/analytics/record vs /api/analytics/record/batch.
+
+Runs against a live server (single uvicorn worker to measure per core):
+
+    python -m benchmarks.bench_analytics_ingest --base-url http://localhost:8000 --token <jwt>
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def _event(i: int) -> dict:
+    return {
+        "eventType": "link_click",
+        "eventAction": "click",
+        "metadata": {"sessionId": f"bench-{i % 500}", "source": "benchmark"},
+        "performance": {"ttfb": i % 300},
+    }
+
+
+async def _single(client: httpx.AsyncClient, total: int, concurrency: int) -> float:
+    queue = iter(range(total))
+
+    async def worker():
+        for i in queue:
+            response = await client.post("/api/analytics/record", json=_event(i))
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+
+async def _batched(client: httpx.AsyncClient, total: int, concurrency: int, size: int) -> float:
+    queue = iter(range(0, total, size))
+
+    async def worker():
+        for start in queue:
+            batch = [_event(i) for i in range(start, min(start + size, total))]
+            response = await client.post("/api/analytics/record/batch", json=batch)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=30) as client:
+        single = await _single(client, args.events, args.concurrency)
+        batched = await _batched(client, args.events, args.concurrency, args.batch_size)
+
+    print(f"single : {single:10.1f} events/s")
+    print(f"batch  : {batched:10.1f} events/s ({batched / single:.1f}x, {args.batch_size} per request)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""HyperLogLog estimates vs exact distinct counts on a synthetic visitor log.
+
+    python -m benchmarks.bench_hll_accuracy
+
+Simulates 30 days of visits with repeat visitors, keeps one sketch per day,
+and compares single-day and 30-day-union estimates with the exact counts.
+Relative error should stay within a few multiples of 1.04 / sqrt(2 ** p).
+"""
+import math
+import random
+import time
+
+from app.services.hll import DEFAULT_PRECISION, HyperLogLog
+
+
+def main(days: int = 30, daily_visits: int = 20000, population: int = 250000, seed: int = 7):
+    rng = random.Random(seed)
+    sketches, exact_days, everyone = [], [], set()
+    started = time.perf_counter()
+    for _ in range(days):
+        # Skewed population so some visitors come back day after day
+        visitors = {f"s:{int(population * rng.random() ** 2)}" for _ in range(daily_visits)}
+        sketch = HyperLogLog()
+        for v in visitors:
+            sketch.add(v)
+        sketches.append(sketch)
+        exact_days.append(len(visitors))
+        everyone |= visitors
+    elapsed = time.perf_counter() - started
+
+    bound = 1.04 / math.sqrt(1 << DEFAULT_PRECISION)
+    errors = [abs(s.count() - n) / n for s, n in zip(sketches, exact_days)]
+    union = HyperLogLog()
+    for s in sketches:
+        union.merge(s)
+    union_error = abs(union.count() - len(everyone)) / len(everyone)
+
+    print(f"precision p={DEFAULT_PRECISION}, standard error {bound:.2%}, {len(union.to_bytes())} bytes/sketch")
+    print(f"daily:  mean error {sum(errors) / len(errors):.2%}, max {max(errors):.2%}")
+    print(f"30-day union: exact {len(everyone)}, estimate {union.count()}, error {union_error:.2%}")
+    print(f"ingest: {days * daily_visits / elapsed:,.0f} adds/s")
+    assert max(errors) < 4 * bound and union_error < 4 * bound, "estimate outside 4 standard errors"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latency of an unrelated endpoint while a login storm is running.
+
+Runs against a live server with an existing account:
+
+    python -m benchmarks.bench_login_storm --base-url http://localhost:8000 \
+        --email bench@example.com --password secret
+
+With bcrypt on the event loop, /api/health p99 tracks the bcrypt cost times
+the number of queued logins. With the password pool it should stay flat.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return f"p50 {pick(0.50):7.1f} ms  p99 {pick(0.99):7.1f} ms  max {samples[-1] * 1000:7.1f} ms"
+
+
+async def _probe(client: httpx.AsyncClient, seconds: float):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/api/health")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def _storm(client: httpx.AsyncClient, seconds: float, concurrency: int, email: str, password: str):
+    statuses = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            response = await client.post("/api/auth/login", json={"email": email, "password": password})
+            statuses.append(response.status_code)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        idle = await _probe(client, 3)
+        loaded, statuses = await asyncio.gather(
+            _probe(client, args.seconds),
+            _storm(client, args.seconds, args.concurrency, args.email, args.password),
+        )
+
+    print(f"/api/health idle        : {_percentiles(idle)}")
+    print(f"/api/health login storm : {_percentiles(loaded)}")
+    counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"logins: {len(statuses)} in {args.seconds:.0f}s ({len(statuses) / args.seconds:.1f}/s), statuses {counts}")
+    print(f"probe median slowdown: {statistics.median(loaded) / statistics.median(idle):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
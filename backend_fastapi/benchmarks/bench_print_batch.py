@@ -0,0 +1,63 @@
+"""Print-batch throughput: images/sec rendered into the streamed ZIP per worker count.
+
+    python -m benchmarks.bench_print_batch --count 2000
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/tapon")
+os.environ.setdefault("JWT_SECRET", "bench")
+os.environ["QR_RENDER_CACHE_DIR"] = ""
+
+from beanie import PydanticObjectId  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.models.qr import QRSettings  # noqa: E402
+from app.services import workers  # noqa: E402
+from app.services.print_batch import stream_print_batch  # noqa: E402
+
+
+async def _codes(count: int):
+    for i in range(count):
+        yield SimpleNamespace(
+            id=PydanticObjectId(),
+            profile=PydanticObjectId(),
+            name=f"Card {i}",
+            qrData=f"https://tapon.example/p/user{i:06d}",
+            logo=None,
+            settings=QRSettings(size=600),
+        )
+
+
+async def _run(count: int, fmt: str) -> int:
+    size = 0
+    async for chunk in stream_print_batch(_codes(count), fmt):
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--format", default="png")
+    args = parser.parse_args()
+
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    baseline = None
+    print(f"{'workers':>8} {'images/s':>10} {'speedup':>8} {'zip MB':>8}")
+    for n in counts:
+        settings.RENDER_WORKERS = n
+        workers.shutdown_workers()
+        started = time.perf_counter()
+        size = asyncio.run(_run(args.count, args.format))
+        rate = args.count / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"{n:>8} {rate:>10.1f} {rate / baseline:>7.2f}x {size / 1e6:>8.2f}")
+    workers.shutdown_workers()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Per-row CPU and memory cost of the list endpoints' read path.
+
+    MONGO_URI=mongodb://localhost:27017/tapon python -m benchmarks.bench_read_path
+
+Mongo is only needed so Beanie can initialise; rows are synthetic and
+nothing is read or written. For each collection it compares:
+
+  hydrate  full document -> Beanie Document -> .dict() -> response model
+  raw      projected document -> RowReader.row -> response model
+
+Both end with the validation and JSON dump FastAPI does for response_model.
+The raw path also moves fewer bytes off the wire; that isn't measured here.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from beanie import init_beanie
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.models.order import Order
+from app.models.profile import Profile
+from app.models.qr import QRCode
+from app.schemas.order import OrderResponse
+from app.schemas.profile import ProfileResponse
+from app.schemas.qr import QRResponse
+from app.services.reads import RowReader
+
+
+def qr_doc(i: int) -> dict:
+    now = datetime(2024, 1, 1) + timedelta(seconds=i)
+    return {
+        "_id": ObjectId(), "user": ObjectId(), "profile": ObjectId(),
+        "name": f"Card {i}", "type": "profile", "qrData": f"https://tapon.example/p/user{i}",
+        "qrImage": None, "logo": None, "scanCount": i, "isActive": True,
+        "settings": {"size": 200, "foregroundColor": "#000000", "backgroundColor": "#FFFFFF",
+                     "errorCorrectionLevel": "M", "margin": 4, "expiresAt": None, "maxScans": None},
+        "analytics": {"totalScans": i, "uniqueScans": i // 2, "lastScannedAt": now},
+        "created_at": now, "updated_at": now,
+    }
+
+
+def order_doc(i: int) -> dict:
+    now = datetime(2024, 1, 1) + timedelta(seconds=i)
+    return {
+        "_id": ObjectId(), "user": ObjectId(), "orderNumber": f"TAP-{i}", "productType": "nfc_card",
+        "quantity": 2, "items": [{"productType": "nfc_card", "quantity": 2, "unitPrice": 19.5}],
+        "totalAmount": 39.0, "status": "processing", "paymentStatus": "paid",
+        "shippingAddress": {"firstName": "Ann", "lastName": "Lee", "address1": "1 Main St", "city": "Town",
+                            "state": "CA", "postalCode": "90000", "country": "US", "phone": "555"},
+        "notes": [{"message": "Packed", "addedBy": ObjectId(), "addedAt": now}],
+        "trackingNumber": None, "estimatedDelivery": None, "created_at": now, "updated_at": now,
+    }
+
+
+def profile_doc(i: int) -> dict:
+    now = datetime(2024, 1, 1) + timedelta(seconds=i)
+    return {
+        "_id": ObjectId(), "user": ObjectId(), "displayName": f"User {i}", "username": f"user{i}",
+        "bio": "Building things.", "jobTitle": "Engineer", "company": "Tapon", "theme": "default",
+        "isPublic": True, "socialLinks": {"github": f"https://github.com/user{i}"},
+        "contactInfo": {"email": f"user{i}@example.com"}, "customFields": [],
+        "settings": {"showEmail": True}, "created_at": now, "updated_at": now,
+    }
+
+
+def hydrate_qr(doc):
+    q = QRCode.model_validate(doc)
+    return QRResponse(**q.dict(exclude={"id", "user", "profile"}), id=str(q.id), user=str(q.user), profile=str(q.profile))
+
+
+def hydrate_order(doc):
+    o = Order.model_validate(doc)
+    return OrderResponse(**o.dict(exclude={"id", "user"}), id=str(o.id), user=str(o.user))
+
+
+def hydrate_profile(doc):
+    p = Profile.model_validate(doc)
+    return ProfileResponse(**p.dict(exclude={"id", "user"}), id=str(p.id), user=str(p.user))
+
+
+def measure(label: str, make_doc, convert, response_model, rows: int, rounds: int):
+    docs = [make_doc(i) for i in range(rows)]
+
+    def one(doc):
+        return response_model.model_validate(convert(doc)).model_dump(mode="json")
+
+    pages = [[dict(doc) for doc in docs] for _ in range(rounds + 1)]
+    [one(doc) for doc in pages.pop()]  # warm up
+    best = float("inf")
+    for page in pages:
+        started = time.perf_counter()
+        [one(doc) for doc in page]
+        best = min(best, time.perf_counter() - started)
+
+    # Memory held at the worst moment of converting one row, above what the row itself costs
+    transient = 0
+    tracemalloc.start()
+    for doc in docs:
+        doc = dict(doc)
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        one(doc)
+        transient += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print(f"  {label:<8} {best / rows * 1e6:8.1f} us/row   transient peak {transient / rows:7.0f} B/row")
+
+
+def run(rows: int, rounds: int):
+    cases = [
+        ("qrcodes", qr_doc, hydrate_qr, RowReader(QRCode, QRResponse), QRResponse),
+        ("orders", order_doc, hydrate_order, RowReader(Order, OrderResponse), OrderResponse),
+        ("profiles", profile_doc, hydrate_profile, RowReader(Profile, ProfileResponse), ProfileResponse),
+    ]
+    for name, make_doc, hydrate, reader, response_model in cases:
+        projected = lambda i, make_doc=make_doc, reader=reader: {
+            k: v for k, v in make_doc(i).items() if k == "_id" or k in reader.projection
+        }
+        print(f"{name} ({rows} rows, best of {rounds})")
+        measure("hydrate", make_doc, hydrate, response_model, rows, rounds)
+        measure("raw", projected, reader.row, response_model, rows, rounds)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    await init_beanie(
+        database=client.get_default_database(),
+        document_models=[QRCode, Order, Profile],
+        skip_indexes=True,
+    )
+    run(args.rows, args.rounds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Registrations per second against a live server.
+
+    python -m benchmarks.bench_registration --base-url http://localhost:8000 \
+        --seconds 20 --concurrency 16
+
+Every request uses a fresh email, so each one runs the full pipeline:
+bcrypt, username allocation and the user/profile/QR inserts. Run it once
+on the old build and once on this one against the same database.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    latencies = []
+    statuses = []
+    deadline = time.perf_counter() + args.seconds
+
+    async def worker(client: httpx.AsyncClient, worker_id: int):
+        n = 0
+        while time.perf_counter() < deadline:
+            n += 1
+            body = {
+                "name": "Bench User",
+                "email": f"bench-{run}-{worker_id}-{n}@example.com",
+                "password": "bench-password",
+            }
+            started = time.perf_counter()
+            response = await client.post("/api/auth/register", json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(response.status_code)
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+    created = statuses.count(201)
+    print(f"registrations: {created} in {elapsed:.1f}s ({created / elapsed:.1f}/s), statuses {counts}")
+    print(f"latency p50 {pick(0.50):.1f} ms  p99 {pick(0.99):.1f} ms  max {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
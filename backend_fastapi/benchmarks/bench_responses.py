@@ -0,0 +1,92 @@
+"""CPU and wire bytes for one page of each list endpoint's response.
+
+    MONGO_URI=mongodb://localhost:27017/tapon python -m benchmarks.bench_responses
+
+Mongo is only needed so Beanie can initialise; rows come from the
+bench_read_path generators through RowReader, exactly as the routes read
+them. For get_my_profiles, get_qr_codes and get_orders it compares:
+
+  validated  response_model validation + FastAPI's JSON dump, what the
+             routes did before they returned rows_response
+  orjson     rows_response: the rows dumped as-is by orjson
+
+then the size of the body as sent, gzipped and brotli'd at the levels
+CompressionMiddleware uses, and what that compression costs.
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.models.order import Order
+from app.models.profile import Profile
+from app.models.qr import QRCode
+from app.schemas.order import OrderResponse
+from app.schemas.profile import ProfileResponse
+from app.schemas.qr import QRResponse
+from app.services.compression import ENCODINGS, compress
+from app.services.reads import RowReader
+from app.services.serialization import rows_response
+from benchmarks.bench_read_path import order_doc, profile_doc, qr_doc
+
+
+def best_of(rounds: int, fn) -> float:
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows: int, rounds: int):
+    cases = [
+        ("get_my_profiles", profile_doc, RowReader(Profile, ProfileResponse), ProfileResponse),
+        ("get_qr_codes", qr_doc, RowReader(QRCode, QRResponse), QRResponse),
+        ("get_orders", order_doc, RowReader(Order, OrderResponse), OrderResponse),
+    ]
+    for name, make_doc, reader, response_model in cases:
+        page = [reader.row(make_doc(i)) for i in range(rows)]
+        adapter = TypeAdapter(List[response_model])
+
+        def validated():
+            return adapter.dump_json(adapter.validate_python(page))
+
+        def fast():
+            return rows_response(page).body
+
+        assert adapter.validate_json(fast()) == adapter.validate_python(page)
+        body = fast()
+        print(f"{name} ({rows} rows, best of {rounds})")
+        print(f"  validated {best_of(rounds, validated) * 1e3:8.3f} ms/request")
+        print(f"  orjson    {best_of(rounds, fast) * 1e3:8.3f} ms/request")
+        print(f"  identity  {len(body):8d} B")
+        for encoding in ENCODINGS:
+            elapsed = best_of(rounds, lambda: compress(body, encoding, fast=True))
+            size = len(compress(body, encoding, fast=True))
+            print(f"  {encoding:<9} {size:8d} B   {elapsed * 1e3:6.3f} ms to compress")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100, help="page size; the routes cap it at 100")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    await init_beanie(
+        database=client.get_default_database(),
+        document_models=[QRCode, Order, Profile],
+        skip_indexes=True,
+    )
+    run(args.rows, args.rounds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""Build the hourly/daily analytics rollups from existing raw events.
+
+    python -m scripts.backfill_rollups [--before 2024-01-01T00:00:00]
+
+Run once, before rollups have been written for the same period, since
+counts are added with \$inc. --before should be the time the rollup writer
+was deployed.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from app.config import settings
+from app.models.analytics import Analytics, HourlyAnalyticsRollup, DailyAnalyticsRollup
+from app.services.rollups import RollupWriter
+
+BATCH = 5000
+
+
+async def backfill(before: datetime) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    await init_beanie(
+        database=client.get_default_database(),
+        document_models=[Analytics, HourlyAnalyticsRollup, DailyAnalyticsRollup]
+    )
+
+    writer = RollupWriter()
+    seen = 0
+    cursor = Analytics.get_motor_collection().find(
+        {"created_at": {"$lt": before}},
+        {"profile": 1, "qrCode": 1, "eventType": 1, "created_at": 1},
+    )
+    batch = []
+    async for event in cursor:
+        batch.append(event)
+        if len(batch) >= BATCH:
+            writer.add(batch)
+            await writer.flush()
+            seen += len(batch)
+            batch = []
+    writer.add(batch)
+    await writer.flush()
+    seen += len(batch)
+    client.close()
+    if len(writer):
+        # flush() logs and keeps what it couldn't write; nothing is left to retry it here
+        sys.exit(f"Failed to write {len(writer)} rollup counters; see the errors above")
+    print(f"Rolled up {seen} events created before {before.isoformat()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--before", type=datetime.fromisoformat, default=datetime.utcnow())
+    asyncio.run(backfill(parser.parse_args().before))
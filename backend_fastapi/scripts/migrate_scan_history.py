@@ -0,0 +1,79 @@
+"""Move embedded QRCode.analytics.scanHistory into the scan_buckets collection.
+
+    python -m scripts.migrate_scan_history [--dry-run]
+
+Each QR code's history is written to its hourly buckets and then unset from
+the QR document. Re-running is safe; an interruption between those two
+writes for one document can duplicate that document's events only.
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.services.scan_counter import BUCKET_FIELDS, bucket_start
+
+
+def bucket_operations(qr_id, history, max_events):
+    buckets = defaultdict(lambda: {field: [] for field in BUCKET_FIELDS})
+    counts = defaultdict(int)
+    for item in history:
+        at = item.get("timestamp") or datetime.utcnow()
+        start = bucket_start(at)
+        counts[start] += 1
+        events = buckets[start]
+        events["offsets"].append(int((at - start).total_seconds()))
+        for field in BUCKET_FIELDS[1:]:
+            events[field].append(item.get(field))
+
+    return [
+        UpdateOne(
+            {"qrCode": qr_id, "bucket": start},
+            {
+                "$inc": {"total": counts[start]},
+                "$push": {field: {"$each": values, "$slice": max_events} for field, values in events.items()},
+                "$setOnInsert": {"created_at": datetime.utcnow()},
+            },
+            upsert=True,
+        )
+        for start, events in buckets.items()
+    ]
+
+
+async def migrate(dry_run: bool) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client.get_default_database()
+    await db.scan_buckets.create_index([("qrCode", 1), ("bucket", 1)], unique=True)
+
+    migrated = scans = 0
+    cursor = db.qrcodes.find(
+        {"analytics.scanHistory.0": {"$exists": True}},
+        {"analytics.scanHistory": 1},
+    )
+    async for doc in cursor:
+        history = doc["analytics"]["scanHistory"]
+        operations = bucket_operations(doc["_id"], history, settings.SCAN_BUCKET_MAX_EVENTS)
+        if not dry_run:
+            await db.scan_buckets.bulk_write(operations, ordered=False)
+            await db.qrcodes.update_one({"_id": doc["_id"]}, {"$unset": {"analytics.scanHistory": ""}})
+        migrated += 1
+        scans += len(history)
+
+    if not dry_run:
+        # Drop the empty arrays too so no document carries the field any more
+        await db.qrcodes.update_many(
+            {"analytics.scanHistory": {"$exists": True}},
+            {"$unset": {"analytics.scanHistory": ""}},
+        )
+    client.close()
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {scans} scans from {migrated} QR codes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(migrate(parser.parse_args().dry_run))
@@ -0,0 +1,56 @@
+import math
+import random
+
+import pytest
+
+from app.services.hll import DEFAULT_PRECISION, HyperLogLog
+
+# The documented relative standard error; estimates are held to 4 of them
+STANDARD_ERROR = 1.04 / math.sqrt(1 << DEFAULT_PRECISION)
+TOLERANCE = 4 * STANDARD_ERROR
+
+
+def visitor_days(days: int, daily_visits: int, population: int, seed: int):
+    # Skewed population so some visitors come back day after day
+    rng = random.Random(seed)
+    return [
+        {f"s:{int(population * rng.random() ** 2)}" for _ in range(daily_visits)}
+        for _ in range(days)
+    ]
+
+
+def sketch_of(values) -> HyperLogLog:
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def relative_error(sketch: HyperLogLog, exact: int) -> float:
+    return abs(sketch.count() - exact) / exact
+
+
+@pytest.mark.parametrize("distinct", [1000, 50000])
+def test_single_sketch_within_bound(distinct):
+    # 1000 is in the linear-counting range, 50000 well past it
+    values = {f"v:{i}" for i in range(distinct)}
+    assert relative_error(sketch_of(values), distinct) < TOLERANCE
+
+
+def test_merged_sketch_within_bound():
+    days = visitor_days(days=10, daily_visits=10000, population=100000, seed=7)
+    union = HyperLogLog()
+    for visitors in days:
+        sketch = sketch_of(visitors)
+        assert relative_error(sketch, len(visitors)) < TOLERANCE
+        union.merge(sketch)
+
+    everyone = set().union(*days)
+    assert relative_error(union, len(everyone)) < TOLERANCE
+    # Merging loses nothing: it is the sketch of the union itself
+    assert union.to_bytes() == sketch_of(everyone).to_bytes()
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog().merge(HyperLogLog(precision=DEFAULT_PRECISION - 1))
@@ -0,0 +1,78 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.services.pagination import decode_cursor, encode_cursor, keyset_filter, next_page
+
+DOC_ID = ObjectId("6ad2c0fde0e883b8d5b31dba")
+
+
+def raw_cursor(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def test_round_trip_keeps_milliseconds():
+    created_at = datetime(2026, 3, 1, 12, 30, 45, 123000)
+    assert decode_cursor(encode_cursor(created_at, DOC_ID)) == (created_at, DOC_ID)
+
+
+def test_sub_millisecond_precision_is_dropped_as_mongo_does():
+    created_at = datetime(2026, 3, 1, 12, 30, 45, 123999)
+    assert decode_cursor(encode_cursor(created_at, str(DOC_ID)))[0] == created_at.replace(microsecond=123000)
+
+
+def test_before_epoch_round_trips():
+    created_at = datetime(1969, 12, 31, 23, 59, 59, 1000)
+    assert decode_cursor(encode_cursor(created_at, DOC_ID))[0] == created_at
+
+
+def test_aware_datetimes_encode_as_their_utc_instant():
+    naive = datetime(2026, 3, 1, 12, 0)
+    assert encode_cursor(naive.replace(tzinfo=timezone.utc), DOC_ID) == encode_cursor(naive, DOC_ID)
+    plus_two = datetime(2026, 3, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert encode_cursor(plus_two, DOC_ID) == encode_cursor(naive, DOC_ID)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "!!!!",
+    "abc",
+    "é" * 27,
+    raw_cursor(b"\x00" * 19),
+    raw_cursor(b"\x00" * 21),
+    # Decodes to 20 bytes, but no datetime is that far from the epoch
+    raw_cursor((2 ** 62).to_bytes(8, "big") + DOC_ID.binary),
+    raw_cursor((-2 ** 62).to_bytes(8, "big", signed=True) + DOC_ID.binary),
+])
+def test_garbage_and_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_filter_turns_bad_cursors_into_400():
+    assert keyset_filter(None) == {}
+    with pytest.raises(HTTPException) as raised:
+        keyset_filter("not-a-cursor")
+    assert raised.value.status_code == 400
+
+
+def test_keyset_filter_selects_strictly_after_the_cursor():
+    created_at = datetime(2026, 3, 1, 12, 0)
+    assert keyset_filter(encode_cursor(created_at, DOC_ID)) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": DOC_ID}},
+    ]}
+
+
+def test_next_page_advertises_the_last_row_and_drops_unasked_created_at():
+    rows = [{"id": str(ObjectId()), "name": str(i), "created_at": datetime(2026, 3, 1, 12, i)} for i in range(3)]
+    last = rows[1]
+    page, headers = next_page([dict(row) for row in rows], 2, ["name"])
+    assert page == [{"id": rows[0]["id"], "name": "0"}, {"id": last["id"], "name": "1"}]
+    assert decode_cursor(headers["X-Next-Cursor"]) == (last["created_at"], ObjectId(last["id"]))
+
+    page, headers = next_page(rows[:2], 2)
+    assert headers == {} and page == rows[:2]
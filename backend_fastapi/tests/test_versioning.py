@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.versioning import fieldset_etag, if_match_versions, version_etag
+
+DOC_ID = "6ad2c0fde0e883b8d5b31dba"
+OTHER_ID = "6ad2c0fde0e883b8d5b31dbb"
+
+
+@pytest.mark.parametrize("header", [None, "*", " * "])
+def test_no_precondition(header):
+    assert if_match_versions(header, DOC_ID) is None
+
+
+def test_strong_weak_and_list_tags():
+    assert if_match_versions(version_etag(DOC_ID, 3), DOC_ID) == [3]
+    assert if_match_versions(f'W/"{DOC_ID}-v3"', DOC_ID) == [3]
+    assert if_match_versions(f'"{DOC_ID}-v2" , W/"{DOC_ID}-v5"', DOC_ID) == [2, 5]
+
+
+def test_fieldset_tag_names_the_same_version():
+    tag = fieldset_etag(version_etag(DOC_ID, 7), ["name", "bio"])
+    assert tag != version_etag(DOC_ID, 7)
+    assert if_match_versions(tag, DOC_ID) == [7]
+    assert fieldset_etag(version_etag(DOC_ID, 7), None) == version_etag(DOC_ID, 7)
+
+
+def test_version_zero_also_matches_unversioned_documents():
+    assert if_match_versions(version_etag(DOC_ID, 0), DOC_ID) == [0, None]
+
+
+@pytest.mark.parametrize("header", [
+    version_etag(OTHER_ID, 3),
+    f'"{DOC_ID}-v"',
+    f'"{DOC_ID}-v3x"',
+    f'"{DOC_ID}-v-1"',
+    f'"{DOC_ID}-v²"',
+    f'{DOC_ID}-v3',
+    f'"{DOC_ID}-v3',
+    "garbage",
+    "",
+])
+def test_foreign_or_malformed_tags_match_nothing(header):
+    # An empty list still sets a precondition, one no version satisfies (412)
+    assert if_match_versions(header, DOC_ID) == []
+
+
+def test_malformed_tags_do_not_hide_a_valid_one():
+    assert if_match_versions(f'"{DOC_ID}-v²", "nope", "{DOC_ID}-v4"', DOC_ID) == [4]